@@ -20,19 +20,15 @@ class RecipeAdmin(admin.ModelAdmin):
     """Класс отображения в админке модели рецептов"""
     inlines = (TagInline, IngredientsInline)
     list_display = (
-        'id', 'name', 'author', 'cooking_time', 'image', 'pub_date'
+        'id', 'name', 'author', 'cooking_time', 'image', 'pub_date',
+        'favorites_count', 'shopping_cart_count'
     )
     list_display_links = ('id', 'name')
     search_fields = ('name', 'author__username')
     list_filter = ('tags', 'pub_date',)
-    readonly_fields = ('count_add_favorited',)
+    readonly_fields = ('favorites_count', 'shopping_cart_count')
     empty_value_display = '-пусто-'
 
-    def count_add_favorited(self, obj):
-        return Favorite.objects.filter(recipe=obj).count()
-
-    count_add_favorited.short_description = 'Сколько раз добавлен в избранное'
-
 
 class IngredientAdmin(admin.ModelAdmin):
     """Класс отображения в админке модели ингедиентов"""
@@ -0,0 +1,152 @@
+import threading
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.functions import Upper
+
+from .cache import get_catalog_version
+from .models import Ingredient
+
+
+class IngredientIndex:
+    """Префиксный индекс ингредиентов в памяти процесса.
+
+    Поиск возвращает сначала ингредиенты, название которых начинается
+    с запроса, затем те, в которых с запроса начинается одно из слов,
+    и только при нехватке результатов - вхождения в середину слова.
+    Индекс помнит версию справочников, по которой построен, и
+    перестраивается в фоне, как только она сменится в любом процессе.
+    Пока индекс перестраивается, а также если справочник больше
+    INGREDIENT_INDEX_MAX_SIZE, поиск идет по базе данных
+    с тем же порядком групп, используя триграммный индекс."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None
+        self._version = None
+
+    def _build(self):
+        entries = [
+            {'id': pk, 'name': name, 'measurement_unit': unit}
+            for pk, name, unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit')
+        ]
+        entries.sort(key=lambda entry: entry['name'].casefold())
+        keys = [entry['name'].casefold() for entry in entries]
+        words = sorted(
+            (word, position)
+            for position, key in enumerate(keys)
+            for word in key.split()[1:]
+        )
+        offsets = []
+        offset = 0
+        for key in keys:
+            offsets.append(offset)
+            offset += len(key) + 1
+        return entries, keys, words, '\n'.join(keys), offsets
+
+    def _rebuild(self, version):
+        """Функция перестройки индекса под версию справочников.
+        Версия читается до построения, поэтому изменение во время
+        построения приведет к повторной перестройке."""
+        try:
+            too_large = (
+                Ingredient.objects.count() > settings.INGREDIENT_INDEX_MAX_SIZE
+            )
+            self._state = None if too_large else self._build()
+            self._version = version
+        finally:
+            self._lock.release()
+
+    def _rebuild_in_thread(self, version):
+        try:
+            self._rebuild(version)
+        finally:
+            connection.close()
+
+    def _get_state(self):
+        """Функция получения индекса текущей версии справочников.
+        Устаревший индекс не используется: перестройка запускается
+        одним потоком, а до ее окончания возвращается None."""
+        version = get_catalog_version()
+        if self._version == version:
+            return self._state
+        if self._lock.acquire(blocking=False):
+            if settings.INGREDIENT_INDEX_ASYNC:
+                threading.Thread(
+                    target=self._rebuild_in_thread,
+                    args=(version,),
+                    daemon=True
+                ).start()
+            else:
+                self._rebuild(version)
+        return self._state if self._version == version else None
+
+    @staticmethod
+    def _by_prefix(keys, query, limit):
+        found = []
+        for position in range(bisect_left(keys, query), len(keys)):
+            if len(found) >= limit or not keys[position].startswith(query):
+                break
+            found.append(position)
+        return found
+
+    @staticmethod
+    def _by_word(words, query, exclude, limit):
+        found = []
+        for index in range(bisect_left(words, (query,)), len(words)):
+            word, position = words[index]
+            if len(found) >= limit or not word.startswith(query):
+                break
+            if position not in exclude:
+                exclude.add(position)
+                found.append(position)
+        return found
+
+    @staticmethod
+    def _by_substring(blob, offsets, query, exclude, limit):
+        found = []
+        start = blob.find(query)
+        while start != -1 and len(found) < limit:
+            position = bisect_right(offsets, start) - 1
+            if position not in exclude:
+                exclude.add(position)
+                found.append(position)
+            if position + 1 < len(offsets):
+                start = blob.find(query, offsets[position + 1])
+            else:
+                start = -1
+        return found
+
+    @staticmethod
+    def _search_database(query, limit):
+        ingredients = Ingredient.objects.values(
+            'id', 'name', 'measurement_unit').order_by(Upper('name'))
+        found = list(ingredients.filter(name__istartswith=query)[:limit])
+        for lookup in (f' {query}', query):
+            if len(found) >= limit:
+                break
+            found += ingredients.filter(name__icontains=lookup).exclude(
+                pk__in=[entry['id'] for entry in found]
+            )[:limit - len(found)]
+        return found
+
+    def search(self, query, limit=None):
+        limit = limit or settings.INGREDIENT_SEARCH_LIMIT
+        query = query.strip().casefold()
+        state = self._get_state()
+        if state is None:
+            return self._search_database(query, limit)
+        entries, keys, words, blob, offsets = state
+        found = self._by_prefix(keys, query, limit)
+        exclude = set(found)
+        if len(found) < limit:
+            found += self._by_word(words, query, exclude, limit - len(found))
+        if len(found) < limit:
+            found += self._by_substring(
+                blob, offsets, query, exclude, limit - len(found))
+        return [entries[position] for position in found]
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,84 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+CATALOG_VERSION_KEY = 'catalog_version'
+TABLE_VERSION_KEY = 'table_version:{}'
+RECIPE_GENERATION_KEY = 'recipe_generation:{}'
+ALL_RECIPES = 'all'
+
+
+def get_version(key):
+    """Функция получения номера версии по ключу кеша. Отсутствующая
+    версия начинается с текущего времени, чтобы после вытеснения
+    из кеша не совпасть с одной из прежних."""
+    version = cache.get(key)
+    if version is not None:
+        return version
+    version = int(time.time() * 1000)
+    if cache.add(key, version, None):
+        return version
+    return cache.get(key, version)
+
+
+def bump_version(key):
+    """Функция увеличения номера версии: закешированные данные
+    со старой версией в ключе больше не используются."""
+    try:
+        cache.incr(key)
+    except ValueError:
+        get_version(key)
+
+
+def get_catalog_version():
+    """Функция получения текущей версии справочников тэгов
+    и ингредиентов."""
+    return get_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    bump_version(CATALOG_VERSION_KEY)
+
+
+def get_versions(keys):
+    versions = cache.get_many(keys)
+    return tuple(versions.get(key) or get_version(key) for key in keys)
+
+
+def get_table_versions(tables):
+    """Функция получения версий данных набора таблиц."""
+    return get_versions(
+        [TABLE_VERSION_KEY.format(table) for table in sorted(tables)])
+
+
+def bump_table_version(table):
+    bump_version(TABLE_VERSION_KEY.format(table))
+
+
+def get_recipe_generations(tag_ids):
+    """Функция получения поколений рецептов с данными тэгами,
+    а без тэгов - общего поколения всех рецептов."""
+    scopes = sorted(set(tag_ids)) or [ALL_RECIPES]
+    return get_versions(
+        [RECIPE_GENERATION_KEY.format(scope) for scope in scopes])
+
+
+def bump_recipe_generations(tag_ids):
+    """Функция смены поколений рецептов тэгов и общего поколения
+    после изменения рецепта с этими тэгами."""
+    for scope in (ALL_RECIPES, *set(tag_ids)):
+        bump_version(RECIPE_GENERATION_KEY.format(scope))
+
+
+def schedule_generations_bump(tag_recipes, tag_ids=()):
+    """Смена поколений рецептов после фиксации транзакции: к этому
+    моменту тэги рецептов записаны, а параллельный запрос не закеширует
+    старые данные под новым поколением. tag_recipes - queryset связей
+    рецептов с тэгами, вычисляемый уже после фиксации."""
+    def bump():
+        bump_recipe_generations([
+            *tag_ids,
+            *tag_recipes.values_list('tag_id', flat=True).distinct()
+        ])
+    transaction.on_commit(bump)
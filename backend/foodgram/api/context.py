@@ -0,0 +1,41 @@
+from django.utils.functional import cached_property
+
+from .models import Favorite, Follow, ShoppingCart
+
+
+class UserContext:
+    """Контекст текущего пользователя: множества id подписок, избранного
+    и корзины покупок вычисляются не более одного раза за запрос."""
+
+    def __init__(self, user):
+        self.user = user
+        self.is_authenticated = user.is_authenticated
+
+    def _ids(self, model, field):
+        if not self.is_authenticated:
+            return frozenset()
+        return frozenset(
+            model.objects.filter(user=self.user).values_list(field, flat=True)
+        )
+
+    @cached_property
+    def following_ids(self):
+        return self._ids(Follow, 'author_id')
+
+    @cached_property
+    def favorite_ids(self):
+        return self._ids(Favorite, 'recipe_id')
+
+    @cached_property
+    def cart_ids(self):
+        return self._ids(ShoppingCart, 'recipe_id')
+
+
+def get_user_context(request):
+    """Функция получения контекста текущего пользователя,
+    общего для представлений и сериализаторов одного запроса."""
+    context = getattr(request, '_user_context', None)
+    if context is None:
+        context = UserContext(request.user)
+        request._user_context = context
+    return context
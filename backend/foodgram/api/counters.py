@@ -0,0 +1,74 @@
+from django.apps import apps
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('api.Recipe', 'favorites_count', 'api.Favorite', 'recipe'),
+    ('api.Recipe', 'shopping_cart_count', 'api.ShoppingCart', 'recipe'),
+    ('users.User', 'shopping_cart_count', 'api.ShoppingCart', 'user'),
+    ('users.User', 'recipes_count', 'api.Recipe', 'author'),
+    ('users.User', 'followers_count', 'api.Follow', 'author'),
+)
+
+
+def get_counters(related):
+    """Функция получения счетчиков записей модели связи: модели,
+    поля счетчика и поля связи, указывающего на строку со счетчиком."""
+    return [
+        (apps.get_model(model), counter, field)
+        for model, counter, related_label, field in COUNTERS
+        if related_label == related._meta.label
+    ]
+
+
+def change_counter(model, pk, field, delta):
+    """Функция атомарного изменения счетчика выражением F(): значение
+    меняется в самом UPDATE, без чтения в память процесса. Счетчик
+    не уходит в минус, расхождение исправляет reconcile_counters."""
+    change_counters(model, [pk], field, delta)
+
+
+def change_counters(model, pks, field, delta):
+    queryset = model.objects.filter(pk__in=pks)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def actual_count(related, field):
+    """Выражение подсчета связанных записей для каждой строки
+    внешнего запроса."""
+    return Coalesce(
+        Subquery(
+            related.objects.filter(**{field: OuterRef('pk')})
+            .order_by().values(field)
+            .annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+def reconcile(model, counter, related, field, dry_run=False):
+    """Функция исправления счетчика по фактическому числу записей.
+    Возвращает число строк, в которых счетчик разошелся с данными."""
+    drifted = model.objects.annotate(
+        actual=actual_count(related, field)
+    ).exclude(**{counter: F('actual')})
+    total = drifted.count()
+    if total and not dry_run:
+        model.objects.filter(
+            pk__in=list(drifted.values_list('pk', flat=True))
+        ).update(**{counter: actual_count(related, field)})
+    return total
+
+
+def reconcile_all(apps, dry_run=False):
+    """Функция исправления всех счетчиков. Возвращает словарь
+    {счетчик: число строк с расхождением}."""
+    drift = {}
+    for model, counter, related, field in COUNTERS:
+        model, related = apps.get_model(model), apps.get_model(related)
+        drift[f'{model.__name__}.{counter}'] = reconcile(
+            model, counter, related, field, dry_run)
+    return drift
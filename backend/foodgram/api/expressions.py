@@ -0,0 +1,9 @@
+from django.db.models.expressions import RawSQL
+
+
+class RawSubquery(RawSQL):
+    """Подзапрос для правой части IN: lookup сам заключает его в скобки,
+    а двойные скобки превращают подзапрос в скалярный."""
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
@@ -0,0 +1,148 @@
+import heapq
+
+from django.conf import settings
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+
+from .expressions import RawSubquery
+from .models import FeedEntry, Follow, Recipe
+
+
+def is_fanout_author(author):
+    """Рецепты автора раскладываются по лентам подписчиков при записи,
+    если подписчиков не больше FEED_FANOUT_MAX_FOLLOWERS. Рецепты более
+    популярных авторов подмешиваются в ленту при чтении."""
+    return author.followers_count <= settings.FEED_FANOUT_MAX_FOLLOWERS
+
+
+def trim_feeds(user_ids):
+    """Функция обрезки лент пользователей до FEED_MAX_LENGTH записей:
+    лишние записи нумеруются оконной функцией и удаляются одним
+    запросом только для переполненных лент."""
+    max_length = settings.FEED_MAX_LENGTH
+    overflowed = FeedEntry.objects.filter(
+        user_id__in=user_ids
+    ).values('user').annotate(
+        total=Count('id')
+    ).filter(total__gt=max_length).values_list('user', flat=True)
+    overflowed = list(overflowed)
+    if not overflowed:
+        return
+    windowed = FeedEntry.objects.filter(
+        user_id__in=overflowed
+    ).annotate(row_number=Window(
+        expression=RowNumber(),
+        partition_by=[F('user')],
+        order_by=[F('pub_date').desc(), F('recipe').desc()]
+    )).values('id', 'row_number')
+    sql, params = windowed.query.sql_with_params()
+    FeedEntry.objects.filter(id__in=RawSubquery(
+        f'SELECT windowed.id FROM ({sql}) windowed '
+        f'WHERE windowed.row_number > %s',
+        (*params, max_length)
+    )).delete()
+
+
+def fan_out(recipe):
+    """Функция записи нового рецепта в ленты подписчиков автора."""
+    if not is_fanout_author(recipe.author):
+        return
+    followers = list(Follow.objects.filter(
+        author_id=recipe.author_id
+    ).values_list('user_id', flat=True))
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(
+                user_id=user_id,
+                author_id=recipe.author_id,
+                recipe=recipe,
+                pub_date=recipe.pub_date
+            )
+            for user_id in followers
+        ],
+        ignore_conflicts=True
+    )
+    trim_feeds(followers)
+
+
+def follow_author(follow):
+    """Функция добавления в ленту последних рецептов нового автора."""
+    if not is_fanout_author(follow.author):
+        return
+    recipes = Recipe.objects.filter(
+        author_id=follow.author_id
+    ).order_by('-pub_date', '-id').values_list('id', 'pub_date')
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(
+                user_id=follow.user_id,
+                author_id=follow.author_id,
+                recipe_id=recipe_id,
+                pub_date=pub_date
+            )
+            for recipe_id, pub_date in recipes[:settings.FEED_MAX_LENGTH]
+        ],
+        ignore_conflicts=True
+    )
+    trim_feeds([follow.user_id])
+
+
+def rebuild_feed(user_id):
+    """Функция пересборки ленты пользователя целиком, например после
+    того, как автор перешел порог FEED_FANOUT_MAX_FOLLOWERS."""
+    FeedEntry.objects.filter(user_id=user_id).delete()
+    recipes = Recipe.objects.filter(author__in=Follow.objects.filter(
+        user_id=user_id,
+        author__followers_count__lte=settings.FEED_FANOUT_MAX_FOLLOWERS
+    ).values('author')).order_by('-pub_date', '-id').values_list(
+        'id', 'author_id', 'pub_date')
+    FeedEntry.objects.bulk_create(
+        FeedEntry(
+            user_id=user_id,
+            author_id=author_id,
+            recipe_id=recipe_id,
+            pub_date=pub_date
+        )
+        for recipe_id, author_id, pub_date
+        in recipes[:settings.FEED_MAX_LENGTH]
+    )
+
+
+def unfollow_author(follow):
+    FeedEntry.objects.filter(
+        user_id=follow.user_id, author_id=follow.author_id
+    ).delete()
+
+
+def get_feed(user, position, limit):
+    """Функция получения страницы ленты: пары (дата публикации, id
+    рецепта), начиная после позиции position. Записи ленты читаются
+    одним проходом по индексу, рецепты популярных авторов - вторым
+    запросом, и обе упорядоченные выборки сливаются."""
+    entries = FeedEntry.objects.filter(user=user)
+    popular = Recipe.objects.filter(author__in=Follow.objects.filter(
+        user=user,
+        author__followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+    ).values('author'))
+    if position is not None:
+        pub_date, recipe_id = position
+        entries = entries.filter(
+            Q(pub_date__lt=pub_date)
+            | Q(pub_date=pub_date, recipe_id__lt=recipe_id)
+        )
+        popular = popular.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=recipe_id)
+        )
+    entries = entries.order_by('-pub_date', '-recipe_id').values_list(
+        'pub_date', 'recipe_id')[:limit]
+    popular = popular.order_by('-pub_date', '-id').values_list(
+        'pub_date', 'id')[:limit]
+    page, seen = [], set()
+    for row in heapq.merge(entries, popular, reverse=True):
+        if row[1] in seen:
+            continue
+        seen.add(row[1])
+        page.append(row)
+        if len(page) == limit:
+            break
+    return page
@@ -0,0 +1,77 @@
+import base64
+import binascii
+import uuid
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+from rest_framework import serializers
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ImageVariantField(serializers.ImageField):
+    """Поле ссылки на уменьшенную копию изображения рецепта.
+    Пока копия не готова, отдается ссылка на исходное изображение."""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        return super().get_attribute(instance) or instance.image
+
+
+class StreamingBase64ImageField(Base64ImageField):
+    """Поле изображения в base64, декодируемого частями во временный файл.
+    Размер проверяется до декодирования, а размеры в пикселях - по
+    заголовку файла, без распаковки всего изображения в память."""
+
+    def decode_to_file(self, base64_data):
+        max_size = settings.RECIPE_IMAGE_MAX_SIZE
+        if len(base64_data) // 4 * 3 > max_size:
+            raise serializers.ValidationError(
+                f'Размер изображения больше {max_size / 1024 ** 2:.1f} МБ.')
+        file = TemporaryUploadedFile(
+            str(uuid.uuid4()), None, len(base64_data) // 4 * 3, None)
+        try:
+            for start in range(0, len(base64_data), CHUNK_SIZE):
+                file.write(base64.b64decode(
+                    base64_data[start:start + CHUNK_SIZE], validate=True))
+        except (binascii.Error, ValueError):
+            file.close()
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        file.size = file.tell()
+        file.seek(0)
+        return file
+
+    def get_extension(self, file):
+        """Функция проверки формата и размеров изображения по заголовку."""
+        try:
+            header = Image.open(file)
+        except Exception:
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        width, height = header.size
+        if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+            raise serializers.ValidationError(
+                f'Изображение {width}x{height} слишком большое.')
+        extension = (header.format or '').lower().replace('jpeg', 'jpg')
+        if extension not in self.ALLOWED_TYPES:
+            raise serializers.ValidationError(self.INVALID_TYPE_MESSAGE)
+        return extension
+
+    def to_internal_value(self, base64_data):
+        if base64_data in self.EMPTY_VALUES:
+            return None
+        if not isinstance(base64_data, str):
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        file = self.decode_to_file(base64_data.rpartition(';base64,')[2])
+        try:
+            extension = self.get_extension(file)
+        except serializers.ValidationError:
+            file.close()
+            raise
+        file.name = f'{file.name}.{extension}'
+        file.seek(0)
+        return serializers.ImageField.to_internal_value(self, file)
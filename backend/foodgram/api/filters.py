@@ -1,20 +1,14 @@
 from django_filters import rest_framework as dfilters
 
-from .models import Ingredient, Recipe, Tag
-
-
-class IngredientFilter(dfilters.FilterSet):
-    """Фильтр для поиска ингредиентов по имени"""
-    name = dfilters.CharFilter(field_name="name", lookup_expr="icontains")
-
-    class Meta:
-        model = Ingredient
-        fields = ('name', )
+from .models import Recipe, Tag
+from .search import search_recipes
 
 
 class RecipeFilter(dfilters.FilterSet):
-    """Фильтр рецептов по полям: автор, тэги, избранное, в корзине покупок"""
+    """Фильтр рецептов по полям: автор, тэги, избранное, в корзине покупок
+    и полнотекстовый поиск по названию и описанию"""
     author = dfilters.CharFilter()
+    search = dfilters.CharFilter(method='filter_search')
     is_favorited = dfilters.BooleanFilter(method='get_is_favorited')
     is_in_shopping_cart = dfilters.BooleanFilter(
         method='get_is_in_shopping_cart')
@@ -24,6 +18,9 @@ class RecipeFilter(dfilters.FilterSet):
         to_field_name='slug',
     )
 
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
     def get_is_favorited(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
             return queryset.filter(favorites__user=self.request.user)
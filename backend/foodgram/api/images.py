@@ -0,0 +1,123 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from .cache import bump_recipe_generations
+from .models import Recipe, TagRecipe
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.RECIPE_IMAGE_WORKERS,
+    thread_name_prefix='recipe-image'
+)
+
+
+VARIANT_FIELDS = tuple(
+    f'image_{variant}' for variant in settings.RECIPE_IMAGE_VARIANTS)
+
+
+def get_stem(name):
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+def has_variants(recipe):
+    """Функция проверки, что уменьшенные копии сделаны
+    из текущего изображения рецепта. Имя исходного изображения
+    запоминается при записи копий, так как storage.save может
+    переименовать файл копии."""
+    return recipe.image_variants_source == recipe.image.name
+
+
+def delete_files(storage, names):
+    for name in names:
+        if name:
+            storage.delete(name)
+
+
+def encode(image, size):
+    image = ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+    image_format = settings.RECIPE_IMAGE_FORMAT
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(
+        buffer,
+        image_format,
+        quality=settings.RECIPE_IMAGE_QUALITY,
+        optimize=True
+    )
+    return ContentFile(buffer.getvalue())
+
+
+def build_variants(recipe_id, image_name):
+    """Функция создания уменьшенных копий изображения рецепта.
+    Копии записываются, только если изображение рецепта
+    не сменилось за время обработки. Замененные копии, как и
+    ненужные новые, удаляются после фиксации транзакции."""
+    storage = Recipe._meta.get_field('image').storage
+    extension = EXTENSIONS[settings.RECIPE_IMAGE_FORMAT]
+    largest = max(settings.RECIPE_IMAGE_VARIANTS.values())
+    with storage.open(image_name) as file:
+        image = Image.open(file)
+        image.draft('RGB', largest)
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+        names = {}
+        for variant, size in settings.RECIPE_IMAGE_VARIANTS.items():
+            field = Recipe._meta.get_field(f'image_{variant}')
+            name = field.generate_filename(
+                None, f'{get_stem(image_name)}.{extension}')
+            names[field.name] = storage.save(name, encode(image, size))
+    with transaction.atomic():
+        previous = Recipe.objects.select_for_update().filter(
+            pk=recipe_id, image=image_name).values_list(
+            *VARIANT_FIELDS).first()
+        if previous is None:
+            superseded = names.values()
+        else:
+            Recipe.objects.filter(pk=recipe_id).touch(
+                image_variants_source=image_name, **names)
+            superseded = set(previous) - set(names.values())
+        transaction.on_commit(lambda: delete_files(storage, superseded))
+    if previous is not None:
+        bump_recipe_generations(TagRecipe.objects.filter(
+            recipe_id=recipe_id).values_list('tag_id', flat=True))
+
+
+def run_build_variants(recipe_id, image_name):
+    try:
+        build_variants(recipe_id, image_name)
+    except Exception:
+        logger.exception(
+            'Не удалось обработать изображение рецепта %s', recipe_id)
+
+
+def run_build_variants_in_thread(recipe_id, image_name):
+    try:
+        run_build_variants(recipe_id, image_name)
+    finally:
+        connection.close()
+
+
+def schedule_variants(recipe):
+    """Функция постановки обработки изображения рецепта в пул потоков
+    после фиксации транзакции, чтобы не задерживать ответ на запрос."""
+    if not recipe.image or has_variants(recipe):
+        return
+    recipe_id, image_name = recipe.pk, recipe.image.name
+    if not settings.RECIPE_IMAGE_ASYNC:
+        transaction.on_commit(
+            lambda: run_build_variants(recipe_id, image_name))
+        return
+    transaction.on_commit(lambda: executor.submit(
+        run_build_variants_in_thread, recipe_id, image_name))
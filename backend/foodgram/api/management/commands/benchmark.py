@@ -0,0 +1,330 @@
+import base64
+import json
+import platform
+import time
+import tracemalloc
+import uuid
+
+import django
+from api.models import Favorite, Follow, Ingredient, Recipe, ShoppingCart, Tag
+from api.renderers import FastJSONRenderer
+from api.seed import (DATASET_OPTIONS, WORDS, add_dataset_arguments,
+                      make_image, seed, temporary_database)
+from api.serializers import RecipeReadSerializer
+from api.views import RecipeViewSet
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.test import (APIClient, APIRequestFactory,
+                                 force_authenticate)
+from users.models import User
+
+CARD_FIELDS = 'id,name,image,cooking_time,is_favorited,is_in_shopping_cart'
+RENDER_PAGE_SIZE = 24
+
+
+def get_benchmark_caches():
+    """Функция настроек кеша для замера: настроенные бэкенды с отдельным
+    префиксом ключей, чтобы замер учитывал обращения к кешу, но не
+    читал и не сбрасывал рабочие данные."""
+    prefix = f'benchmark-{uuid.uuid4().hex}'
+    return {
+        alias: {**config, 'KEY_PREFIX': prefix}
+        for alias, config in settings.CACHES.items()
+    }
+
+
+def percentile(values, percent):
+    """Процентиль по методу ближайшего ранга."""
+    values = sorted(values)
+    rank = max(0, -(-len(values) * percent // 100) - 1)
+    return values[int(rank)]
+
+
+class Scenario:
+    """Сценарий нагрузки: один запрос к API. prepare выполняется перед
+    каждым запросом и в замер не входит."""
+
+    def __init__(self, name, request, prepare=None):
+        self.name = name
+        self.request = request
+        self.prepare = prepare
+
+    def run(self):
+        if self.prepare is not None:
+            self.prepare()
+        start = time.perf_counter()
+        response = self.request()
+        if response.streaming:
+            b''.join(response.streaming_content)
+        if response.status_code >= 400:
+            raise CommandError(
+                f'{self.name}: ответ {response.status_code} '
+                f'{getattr(response, "data", "")}')
+        return time.perf_counter() - start
+
+
+class RenderScenario(Scenario):
+    """Сценарий сборки и рендера страницы рецептов без HTTP-запроса:
+    request возвращает байты JSON."""
+
+    def run(self):
+        start = time.perf_counter()
+        self.request()
+        return time.perf_counter() - start
+
+
+def get_render_scenarios(user):
+    """Функция сценариев сравнения списка рецептов через
+    RecipeReadSerializer и через RecipeReader на одной странице.
+    Оба пути должны давать одинаковые байты JSON."""
+    request = APIRequestFactory().get('/api/recipes/')
+    force_authenticate(request, user)
+    view = RecipeViewSet(
+        action_map={'get': 'list'}, kwargs={}, format_kwarg=None)
+    view.request = view.initialize_request(request)
+    page = list(view.get_queryset().values_list(
+        'pk', flat=True)[:RENDER_PAGE_SIZE])
+    renderer = FastJSONRenderer()
+
+    def render_serializer():
+        objects = view.get_queryset().in_bulk(page)
+        serializer = RecipeReadSerializer(
+            [objects[pk] for pk in page],
+            many=True,
+            context=view.get_serializer_context()
+        )
+        return renderer.render(serializer.data)
+
+    def render_reader():
+        return renderer.render(view.get_list_data(page))
+
+    if render_serializer() != render_reader():
+        raise CommandError(
+            'RecipeReader и RecipeReadSerializer дают разный JSON')
+    return [
+        RenderScenario('recipes_page_serializer', render_serializer),
+        RenderScenario('recipes_page_reader', render_reader),
+    ]
+
+
+class Command(BaseCommand):
+    help = ('Замер основных запросов к API на синтетических данных. '
+            'Данные создаются в тестовой БД (SQLite в памяти или '
+            'test_<имя> на PostgreSQL), рабочая БД не затрагивается')
+
+    def add_arguments(self, parser):
+        add_dataset_arguments(parser)
+        parser.add_argument(
+            '--repeat', type=int, default=50,
+            help='Сколько раз выполнить каждый сценарий')
+        parser.add_argument(
+            '--warmup', type=int, default=3,
+            help='Сколько запросов сделать до замера')
+        parser.add_argument(
+            'scenarios', nargs='*',
+            help='Сценарии для замера, по умолчанию - все')
+        parser.add_argument(
+            '--save', metavar='PATH',
+            help='Сохранить результаты в json-файл базовой линии')
+        parser.add_argument(
+            '--compare', metavar='PATH',
+            help='Сравнить с сохраненной базовой линией')
+        parser.add_argument(
+            '--threshold', type=float, default=10.0,
+            help='Рост p95 в процентах, считающийся регрессом')
+
+    def get_scenarios(self):
+        user = User.objects.order_by('pk').first()
+        client, anonymous = APIClient(), APIClient()
+        client.force_authenticate(user)
+        own = Recipe.objects.filter(author=user).order_by('pk').first()
+        other = Recipe.objects.exclude(author=user).order_by('pk').first()
+        tags = list(Tag.objects.order_by('pk').values_list('pk', 'slug'))
+        ingredients = list(Ingredient.objects.order_by('pk').values_list(
+            'pk', flat=True)[:10])
+        author = Follow.objects.filter(user=user).values_list(
+            'author_id', flat=True).first()
+        image = base64.b64encode(make_image()).decode()
+        image = f'data:image/png;base64,{image}'
+        counter = iter(range(1, 10 ** 9))
+
+        def payload(**extra):
+            step = next(counter)
+            return {
+                'name': f'Рецепт {step}',
+                'text': ' '.join(WORDS),
+                'cooking_time': 10 + step % 50,
+                'tags': [pk for pk, slug in tags[:2]],
+                'ingredients': [
+                    {'id': pk, 'amount': step % 100 + 1}
+                    for pk in ingredients[:6]
+                ],
+                **extra
+            }
+
+        def toggle(model, url, method, present):
+            def prepare():
+                if present:
+                    model.objects.get_or_create(user=user, recipe=other)
+                else:
+                    model.objects.filter(user=user, recipe=other).delete()
+            return Scenario(
+                f'{model.__name__.lower()}_{method}',
+                lambda: getattr(client, method)(url),
+                prepare
+            )
+
+        return [
+            Scenario('recipes_list', lambda: client.get(
+                '/api/recipes/?page=1&limit=6')),
+            Scenario('recipes_list_anonymous', lambda: anonymous.get(
+                '/api/recipes/?page=1&limit=6')),
+            Scenario('recipes_list_page_10', lambda: client.get(
+                '/api/recipes/?page=10&limit=6')),
+            Scenario('recipes_list_tags', lambda: client.get(
+                f'/api/recipes/?tags={tags[0][1]}&tags={tags[1][1]}')),
+            Scenario('recipes_list_author', lambda: client.get(
+                f'/api/recipes/?author={author}')),
+            Scenario('recipes_list_favorited', lambda: client.get(
+                '/api/recipes/?is_favorited=1')),
+            Scenario('recipes_list_search', lambda: client.get(
+                f'/api/recipes/?search={WORDS[0]}')),
+            Scenario('recipes_list_cards', lambda: client.get(
+                f'/api/recipes/?limit=24&fields={CARD_FIELDS}')),
+            Scenario('recipe_detail', lambda: client.get(
+                f'/api/recipes/{other.pk}/')),
+            Scenario('feed', lambda: client.get('/api/recipes/feed/')),
+            Scenario('subscriptions', lambda: client.get(
+                '/api/users/subscriptions/?recipes_limit=3')),
+            Scenario('shopping_list_download', lambda: client.get(
+                '/api/recipes/download_shopping_cart/')),
+            toggle(Favorite, f'/api/recipes/{other.pk}/favorite/',
+                   'post', False),
+            toggle(Favorite, f'/api/recipes/{other.pk}/favorite/',
+                   'delete', True),
+            toggle(ShoppingCart, f'/api/recipes/{other.pk}/shopping_cart/',
+                   'post', False),
+            toggle(ShoppingCart, f'/api/recipes/{other.pk}/shopping_cart/',
+                   'delete', True),
+            Scenario('recipe_create', lambda: client.post(
+                '/api/recipes/', payload(image=image), format='json')),
+            Scenario('recipe_update', lambda: client.patch(
+                f'/api/recipes/{own.pk}/', payload(), format='json')),
+            *get_render_scenarios(user),
+        ]
+
+    def measure(self, scenario, options):
+        """Функция замера сценария: время - по repeat запросам, число
+        SQL-запросов и пик выделенной памяти - по одному отдельному
+        запросу, так как их учет сам замедляет выполнение."""
+        for _ in range(options['warmup']):
+            scenario.run()
+        timings = [scenario.run() for _ in range(options['repeat'])]
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                if scenario.prepare is not None:
+                    scenario.prepare()
+                tracemalloc.clear_traces()
+                start = len(queries)
+                scenario.run()
+                peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return {
+            'p50_ms': round(percentile(timings, 50) * 1000, 3),
+            'p95_ms': round(percentile(timings, 95) * 1000, 3),
+            'p99_ms': round(percentile(timings, 99) * 1000, 3),
+            'mean_ms': round(sum(timings) / len(timings) * 1000, 3),
+            'queries': len(queries) - start,
+            'alloc_kib': round(peak / 1024, 1),
+        }
+
+    def run_benchmark(self, options):
+        self.stdout.write('Заполнение тестовой БД...')
+        start = time.monotonic()
+        seed(options)
+        self.stdout.write(
+            f'Данные созданы за {time.monotonic() - start:.1f} с: '
+            f'{Recipe.objects.count()} рецептов, '
+            f'{User.objects.count()} пользователей'
+        )
+        backend = settings.CACHES['default']['BACKEND']
+        cache.set('benchmark', True)
+        if cache.get('benchmark'):
+            self.stdout.write(f'Кеш: {backend}')
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'Кеш {backend} недоступен, замер без кеша'))
+        scenarios = self.get_scenarios()
+        selected = options['scenarios']
+        unknown = set(selected) - {scenario.name for scenario in scenarios}
+        if unknown:
+            raise CommandError(
+                f'Неизвестные сценарии: {", ".join(sorted(unknown))}')
+        results = {}
+        for scenario in scenarios:
+            if not selected or scenario.name in selected:
+                results[scenario.name] = self.measure(scenario, options)
+        return results
+
+    def report(self, results, baseline, threshold):
+        header = (f'{"сценарий":28} {"p50 мс":>9} {"p95 мс":>9} '
+                  f'{"p99 мс":>9} {"SQL":>5} {"КиБ":>9}')
+        if baseline:
+            header += f' {"Δp95":>8} {"ΔSQL":>5}'
+        self.stdout.write(header)
+        regressions = []
+        for name, result in results.items():
+            line = (
+                f'{name:28} {result["p50_ms"]:9.2f} {result["p95_ms"]:9.2f} '
+                f'{result["p99_ms"]:9.2f} {result["queries"]:5} '
+                f'{result["alloc_kib"]:9.1f}'
+            )
+            previous = baseline.get(name)
+            if previous:
+                change = (
+                    result['p95_ms'] / previous['p95_ms'] - 1) * 100
+                queries = result['queries'] - previous['queries']
+                line += f' {change:+7.1f}% {queries:+5}'
+                if change > threshold or queries > 0:
+                    regressions.append(name)
+                    line = self.style.WARNING(line)
+            self.stdout.write(line)
+        if regressions:
+            self.stdout.write(self.style.WARNING(
+                f'Регресс относительно базовой линии: '
+                f'{", ".join(regressions)}'))
+
+    def handle(self, *args, **options):
+        baseline = {}
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                baseline = json.load(file)['results']
+        with temporary_database():
+            with override_settings(CACHES=get_benchmark_caches()):
+                results = self.run_benchmark(options)
+        self.report(results, baseline, options['threshold'])
+        if options['save']:
+            dataset = {
+                name: options[name]
+                for name in (*DATASET_OPTIONS, 'seed', 'repeat')
+            }
+            with open(options['save'], 'w', encoding='utf-8') as file:
+                json.dump({
+                    'created': timezone.now().isoformat(),
+                    'environment': {
+                        'database': connection.vendor,
+                        'cache': settings.CACHES['default']['BACKEND'],
+                        'python': platform.python_version(),
+                        'django': django.get_version(),
+                    },
+                    'dataset': dataset,
+                    'results': results,
+                }, file, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f'Базовая линия сохранена в {options["save"]}'))
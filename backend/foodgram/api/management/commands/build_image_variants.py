@@ -0,0 +1,17 @@
+from api.images import has_variants, run_build_variants
+from api.models import Recipe
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Создание уменьшенных копий изображений для всех рецептов'
+
+    def handle(self, *args, **options):
+        built = 0
+        recipes = Recipe.objects.only('id', 'image', 'image_variants_source')
+        for recipe in recipes.iterator():
+            if recipe.image and not has_variants(recipe):
+                run_build_variants(recipe.pk, recipe.image.name)
+                built += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {built}'))
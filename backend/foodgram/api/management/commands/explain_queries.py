@@ -0,0 +1,89 @@
+import time
+
+from api.models import Favorite, Follow, Recipe, ShoppingCart, TagRecipe
+from api.seed import add_dataset_arguments, seed, temporary_database
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+from django.db.models import Exists, OuterRef
+from users.models import User
+
+MIGRATION = ('api', '0022_relation_constraints')
+
+
+class RollbackError(Exception):
+    """Исключение для отката временно отмененной миграции."""
+
+
+class Command(BaseCommand):
+    help = ('Планы и время выполнения запросов к таблицам связей, '
+            'выполняемых на каждом запросе к API, без индексов и '
+            'ограничений миграции 0022 и с ними. Запросы выполняются '
+            'на синтетических данных в тестовой БД, рабочая БД '
+            'не затрагивается')
+
+    def add_arguments(self, parser):
+        add_dataset_arguments(parser)
+        parser.add_argument(
+            '--repeat', type=int, default=100,
+            help='Сколько раз выполнить каждый запрос для замера времени'
+        )
+
+    def get_queries(self):
+        user = User.objects.order_by('id').first()
+        recipe = Recipe.objects.first()
+        tag = TagRecipe.objects.values_list('tag', flat=True).first()
+        return {
+            'Лента рецептов': Recipe.objects.order_by('-pub_date', '-id')[:6],
+            'Флаги избранного и корзины': Recipe.objects.annotate(
+                is_favorited=Exists(Favorite.objects.filter(
+                    user=user, recipe=OuterRef('pk'))),
+                is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                    user=user, recipe=OuterRef('pk')))
+            )[:6],
+            'Фильтр по тэгу': Recipe.objects.filter(tags=tag)[:6],
+            'Фильтр избранного': Recipe.objects.filter(
+                favorites__user=user)[:6],
+            'Проверка избранного': Favorite.objects.filter(
+                user=user, recipe=recipe),
+            'Проверка подписки': Follow.objects.filter(
+                user=user, author=recipe.author),
+        }
+
+    def explain(self, queries, repeat):
+        for title, queryset in queries.items():
+            start = time.perf_counter()
+            for _ in range(repeat):
+                list(queryset.all())
+            elapsed = (time.perf_counter() - start) / repeat
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{title}: {elapsed * 1000:.3f} мс'))
+            self.stdout.write(queryset.explain())
+
+    def explain_before(self, queries, repeat):
+        """Функция вывода планов до миграции: миграция отменяется
+        в транзакции тестовой БД, которая после замеров откатывается."""
+        loader = MigrationLoader(connection)
+        if MIGRATION not in loader.applied_migrations:
+            raise CommandError(f'Миграция {MIGRATION[1]} не применена')
+        migration = loader.get_migration(*MIGRATION)
+        state = loader.project_state(MIGRATION, at_end=False)
+        try:
+            with connection.schema_editor() as editor:
+                migration.unapply(state, editor)
+                self.explain(queries, repeat)
+                raise RollbackError
+        except RollbackError:
+            pass
+
+    def handle(self, *args, **options):
+        with temporary_database():
+            self.stdout.write('Заполнение тестовой БД...')
+            seed(options)
+            queries = self.get_queries()
+            self.stdout.write(self.style.SUCCESS(
+                f'До миграции {MIGRATION[1]}'))
+            self.explain_before(queries, options['repeat'])
+            self.stdout.write(self.style.SUCCESS(
+                f'После миграции {MIGRATION[1]}'))
+            self.explain(queries, options['repeat'])
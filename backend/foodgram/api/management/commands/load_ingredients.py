@@ -0,0 +1,132 @@
+import csv
+import json
+import os
+import re
+import time
+
+from api.cache import bump_catalog_version
+from api.models import Ingredient
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+CHUNK_SIZE = 64 * 1024
+SEPARATORS = re.compile(r'[\s,]*')
+
+
+def iter_csv(file):
+    """Генератор строк csv-файла вида: название,единица измерения."""
+    for row in csv.reader(file):
+        if row == ['name', 'measurement_unit']:
+            continue
+        if len(row) != 2:
+            raise CommandError(f'Некорректная строка: {row}')
+        yield row
+
+
+def iter_json(file):
+    """Генератор элементов json-массива, читающий файл по частям."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Ожидается json-массив ингредиентов')
+    position = 1
+    while True:
+        position = SEPARATORS.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            chunk = file.read(CHUNK_SIZE)
+            if not chunk:
+                raise CommandError('Некорректный json-файл')
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item['name'], item['measurement_unit']
+
+
+READERS = {
+    'csv': iter_csv,
+    'json': iter_json,
+}
+
+
+class Command(BaseCommand):
+    help = 'Загрузка ингредиентов из csv или json файла'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу с ингредиентами')
+        parser.add_argument(
+            '--format',
+            choices=READERS.keys(),
+            help='Формат файла, по умолчанию - по расширению'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Число ингредиентов в одном INSERT'
+        )
+
+    def insert_batch(self, batch):
+        """Функция записи пачки ингредиентов: уже имеющиеся в БД
+        пропускаются, поэтому повторный запуск ничего не дублирует."""
+        existing = set(
+            Ingredient.objects.filter(
+                name__in={name for name, unit in batch}
+            ).values_list('name', 'measurement_unit')
+        )
+        new = [
+            Ingredient(name=name, measurement_unit=unit)
+            for name, unit in batch if (name, unit) not in existing
+        ]
+        Ingredient.objects.bulk_create(new)
+        return len(new)
+
+    @staticmethod
+    def lock_table():
+        """Функция блокировки таблицы ингредиентов до конца транзакции:
+        уникальности (название, единица) в БД нет, поэтому параллельный
+        запуск ждет завершения текущего и видит уже добавленные записи.
+        SQLite и так не допускает параллельной записи."""
+        if connection.vendor != 'postgresql':
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'LOCK TABLE {Ingredient._meta.db_table} '
+                f'IN SHARE ROW EXCLUSIVE MODE'
+            )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = (
+            options['format'] or os.path.splitext(path)[1].lstrip('.')
+        )
+        if file_format not in READERS:
+            raise CommandError(f'Неизвестный формат файла: {path}')
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('--batch-size должен быть больше нуля')
+        start = time.monotonic()
+        total = created = 0
+        batch = {}
+        with open(path, 'r', encoding='utf-8') as file:
+            with transaction.atomic():
+                self.lock_table()
+                for name, unit in READERS[file_format](file):
+                    total += 1
+                    name, unit = name.strip(), unit.strip()
+                    if name:
+                        batch[(name, unit)] = None
+                    if len(batch) >= batch_size:
+                        created += self.insert_batch(list(batch))
+                        batch = {}
+                if batch:
+                    created += self.insert_batch(list(batch))
+        bump_catalog_version()
+        elapsed = time.monotonic() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Прочитано строк: {total}, добавлено ингредиентов: {created} '
+            f'за {elapsed:.2f} с ({total / max(elapsed, 1e-6):.0f} строк/с)'
+        ))
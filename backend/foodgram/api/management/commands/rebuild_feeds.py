@@ -0,0 +1,27 @@
+from api.feed import rebuild_feed
+from api.models import Follow
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+
+class Command(BaseCommand):
+    help = 'Пересборка лент подписок пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'users',
+            nargs='*',
+            type=int,
+            help='id пользователей, по умолчанию - все подписчики'
+        )
+
+    def handle(self, *args, **options):
+        users = options['users'] or Follow.objects.values_list(
+            'user_id', flat=True).distinct().order_by('user_id')
+        total = 0
+        for user_id in users:
+            with transaction.atomic():
+                rebuild_feed(user_id)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересобрано лент: {total}'))
@@ -0,0 +1,14 @@
+from api.shopping_list import fill_shopping_lists
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+
+class Command(BaseCommand):
+    help = 'Пересборка списков покупок пользователей по их корзинам'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = fill_shopping_lists(apps)
+        self.stdout.write(self.style.SUCCESS(
+            f'Записано строк списков покупок: {total}'))
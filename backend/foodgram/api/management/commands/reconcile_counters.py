@@ -0,0 +1,24 @@
+from api.counters import reconcile_all
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+
+class Command(BaseCommand):
+    help = ('Сверка счетчиков избранного, корзины, подписчиков '
+            'и рецептов с фактическими данными')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, ничего не исправляя'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drift = reconcile_all(apps, options['dry_run'])
+            for counter, total in drift.items():
+                style = self.style.WARNING if total else self.style.SUCCESS
+                self.stdout.write(style(
+                    f'{counter}: расхождений - {total}'))
@@ -0,0 +1,34 @@
+from django.db import migrations
+from django.db.models import Count, Min
+
+RELATIONS = (
+    ('Favorite', ('user', 'recipe')),
+    ('ShoppingCart', ('user', 'recipe')),
+    ('Follow', ('user', 'author')),
+    ('TagRecipe', ('tag', 'recipe')),
+)
+
+
+def remove_duplicates(apps, schema_editor):
+    """Удаление повторяющихся связей перед добавлением уникальности:
+    остается запись с наименьшим id."""
+    for model_name, fields in RELATIONS:
+        model = apps.get_model('api', model_name)
+        duplicates = model.objects.values(*fields).annotate(
+            keep=Min('id'), total=Count('id')
+        ).filter(total__gt=1).order_by()
+        for row in duplicates:
+            model.objects.filter(
+                **{field: row[field] for field in fields}
+            ).exclude(id=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('api', 'Recipe', 'favorites_count', 'Favorite', 'recipe'),
+    ('api', 'Recipe', 'shopping_cart_count', 'ShoppingCart', 'recipe'),
+    ('users', 'User', 'recipes_count', 'Recipe', 'author'),
+    ('users', 'User', 'followers_count', 'Follow', 'author'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    """Заполнение счетчиков по уже имеющимся данным."""
+    for app_label, model_name, counter, related_name, field in COUNTERS:
+        model = apps.get_model(app_label, model_name)
+        related = apps.get_model('api', related_name)
+        model.objects.update(**{counter: Coalesce(
+            Subquery(
+                related.objects.filter(**{field: OuterRef('pk')})
+                .order_by().values(field)
+                .annotate(total=Count('pk')).values('total'),
+                output_field=IntegerField()
+            ),
+            0
+        )})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_recipe_counters'),
+        ('users', '0003_user_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,93 @@
+from django.db import migrations
+
+POSTGRES_VECTOR = (
+    "setweight(to_tsvector('russian', coalesce({0}.name, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce({0}.text, '')), 'B')"
+)
+
+SQLITE_TRIGGERS = (
+    'CREATE TRIGGER IF NOT EXISTS api_recipe_fts_insert '
+    'AFTER INSERT ON api_recipe BEGIN '
+    'INSERT INTO api_recipe_fts (rowid, name, text) '
+    'VALUES (new.id, new.name, new.text); END',
+    'CREATE TRIGGER IF NOT EXISTS api_recipe_fts_update '
+    'AFTER UPDATE OF name, text ON api_recipe BEGIN '
+    'UPDATE api_recipe_fts SET name = new.name, text = new.text '
+    'WHERE rowid = old.id; END',
+    'CREATE TRIGGER IF NOT EXISTS api_recipe_fts_delete '
+    'AFTER DELETE ON api_recipe BEGIN '
+    'DELETE FROM api_recipe_fts WHERE rowid = old.id; END',
+)
+
+
+def create_postgresql(schema_editor):
+    schema_editor.execute(
+        'ALTER TABLE api_recipe ADD COLUMN search_vector tsvector')
+    schema_editor.execute(
+        'CREATE FUNCTION api_recipe_search_vector() RETURNS trigger AS $$ '
+        f'BEGIN NEW.search_vector := {POSTGRES_VECTOR.format("NEW")}; '
+        'RETURN NEW; END $$ LANGUAGE plpgsql'
+    )
+    schema_editor.execute(
+        'CREATE TRIGGER api_recipe_search_vector_update '
+        'BEFORE INSERT OR UPDATE OF name, text ON api_recipe '
+        'FOR EACH ROW EXECUTE PROCEDURE api_recipe_search_vector()'
+    )
+    schema_editor.execute(
+        'UPDATE api_recipe SET search_vector = '
+        f'{POSTGRES_VECTOR.format("api_recipe")}'
+    )
+    schema_editor.execute(
+        'CREATE INDEX api_recipe_search_idx ON api_recipe '
+        'USING gin (search_vector)'
+    )
+
+
+def create_sqlite(schema_editor):
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE api_recipe_fts USING fts5('
+        "name, text, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        'INSERT INTO api_recipe_fts (rowid, name, text) '
+        'SELECT id, name, text FROM api_recipe'
+    )
+    for trigger in SQLITE_TRIGGERS:
+        schema_editor.execute(trigger)
+
+
+def create_search(apps, schema_editor):
+    """Создание индекса полнотекстового поиска: на PostgreSQL -
+    столбец tsvector с триггером и GIN-индексом, на SQLite -
+    виртуальная таблица FTS5 для локального запуска."""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        create_postgresql(schema_editor)
+    elif vendor == 'sqlite':
+        create_sqlite(schema_editor)
+
+
+def drop_search(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'DROP TRIGGER IF EXISTS api_recipe_search_vector_update '
+            'ON api_recipe'
+        )
+        schema_editor.execute(
+            'DROP FUNCTION IF EXISTS api_recipe_search_vector()')
+        schema_editor.execute(
+            'ALTER TABLE api_recipe DROP COLUMN IF EXISTS search_vector')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS api_recipe_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_fill_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search, drop_search),
+    ]
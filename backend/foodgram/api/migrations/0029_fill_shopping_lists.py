@@ -0,0 +1,37 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def fill(apps, schema_editor):
+    """Заполнение списков покупок по уже имеющимся корзинам."""
+    ingredient_amount = apps.get_model('api', 'IngredientAmount')
+    item_model = apps.get_model('api', 'ShoppingListItem')
+    item_model.objects.all().delete()
+    rows = ingredient_amount.objects.filter(
+        recipe__shoppingcart__isnull=False
+    ).values_list(
+        'recipe__shoppingcart__user_id', 'ingredient_id'
+    ).annotate(
+        total=Sum('amount'),
+        recipes=Count('recipe', distinct=True)
+    ).order_by()
+    item_model.objects.bulk_create(
+        item_model(
+            user_id=user_id,
+            ingredient_id=ingredient_id,
+            total_amount=total,
+            recipes_count=recipes
+        )
+        for user_id, ingredient_id, total, recipes in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0028_shoppinglistitem'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill, migrations.RunPython.noop),
+    ]
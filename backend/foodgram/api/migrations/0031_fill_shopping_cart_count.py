@@ -0,0 +1,31 @@
+from django.db import migrations
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_shopping_cart_count(apps, schema_editor):
+    """Заполнение счетчика корзины пользователей по уже имеющимся данным."""
+    User = apps.get_model('users', 'User')
+    ShoppingCart = apps.get_model('api', 'ShoppingCart')
+    User.objects.update(shopping_cart_count=Coalesce(
+        Subquery(
+            ShoppingCart.objects.filter(user=OuterRef('pk'))
+            .order_by().values('user')
+            .annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0030_recipe_image_variants_source'),
+        ('users', '0004_user_shopping_cart_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            fill_shopping_cart_count, migrations.RunPython.noop),
+    ]
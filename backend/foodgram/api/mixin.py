@@ -1,9 +1,265 @@
+import hashlib
+from calendar import timegm
+from functools import partial
 
-from rest_framework import mixins, viewsets
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.functional import cached_property
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import mixins, serializers, status, viewsets
+from rest_framework.response import Response
 
+from .cache import get_catalog_version
+from .context import get_user_context
 
-class CustomGetRetrieveClass(mixins.ListModelMixin,
+
+class ValuesListMixin(mixins.ListModelMixin):
+    """Миксин списка, собираемого из строк .values() без сериализатора.
+    Подходит для сериализаторов из одних полей модели: ключи ответа
+    и их порядок берутся из Meta.fields."""
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset()).values(
+            *self.get_serializer_class().Meta.fields)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(list(page))
+        return Response(list(queryset))
+
+
+class CustomGetRetrieveClass(ValuesListMixin,
                              mixins.RetrieveModelMixin,
                              viewsets.GenericViewSet):
-    "Кастомный миксин класс для тэгов и ингредиентов"
-    pass
+    """Кастомный миксин класс для тэгов и ингредиентов.
+    Ответы кешируются по версии справочников и помечаются ETag,
+    по которому клиенту возвращается 304 без обращения к БД."""
+
+    def cached_response(self, request, get_response, store=True):
+        """Функция ответа по версии справочников. При store=False
+        ответ только помечается ETag, но не сохраняется в кеш."""
+        version = get_catalog_version()
+        etag = f'"{self.basename}-{version}"'
+        if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED,
+                headers={'ETag': etag}
+            )
+        if not store:
+            response = get_response()
+            response['ETag'] = etag
+            return response
+        key = f'{self.basename}:{version}:{request.get_full_path()}'
+        data = cache.get(key)
+        if data is None:
+            response = get_response()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = response.data
+            cache.set(key, data, settings.CATALOG_CACHE_TIMEOUT)
+        return Response(data, headers={'ETag': etag})
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, partial(super().list, request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, partial(super().retrieve, request, *args, **kwargs))
+
+
+def conditional_response(request, etag, last_modified, get_response):
+    """Функция ответа 304 по If-None-Match / If-Modified-Since
+    или полного ответа, помеченного ETag и Last-Modified."""
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = get_response()
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+class ConditionalListRetrieveMixin:
+    """Миксин условных ответов для списка и объекта. ETag и Last-Modified
+    вычисляются по легкому запросу fingerprint_fields (версия, счетчики,
+    данные автора, флаги текущего пользователя), поэтому на 304
+    объекты не загружаются целиком и не сериализуются. Список
+    пагинируется по отфильтрованному queryset без аннотаций, а
+    fingerprint_fields читаются только для объектов страницы.
+    Last-Modified отдается только для объекта и только анонимным
+    пользователям: флаги избранного, корзины и подписки не меняют дату
+    изменения рецепта, а по датам рецептов страницы не видно удаления
+    рецептов, сдвигающего на нее более старые."""
+    fingerprint_fields = ()
+    page_fields = ('id',)
+
+    def get_fingerprint_rows(self, queryset):
+        return queryset.prefetch_related(None).values(
+            *self.fingerprint_fields)
+
+    def get_page_rows(self, ids):
+        """Функция получения fingerprint_fields объектов в порядке ids."""
+        rows = self.get_fingerprint_rows(
+            self.get_queryset().filter(pk__in=ids))
+        rows = {row['id']: row for row in rows}
+        return [rows[pk] for pk in ids if pk in rows]
+
+    def get_validators(self, rows, extra=None, dated=False):
+        following_ids = get_user_context(self.request).following_ids
+        signature = [extra] + [
+            (tuple(row.values()), row['author_id'] in following_ids)
+            for row in rows
+        ]
+        etag = f'W/"{hashlib.md5(repr(signature).encode()).hexdigest()}"'
+        if not dated or self.request.user.is_authenticated:
+            return etag, None
+        last_modified = max(
+            (row['updated_at'] for row in rows), default=None)
+        if last_modified is not None:
+            last_modified = timegm(last_modified.utctimetuple())
+        return etag, last_modified
+
+    def get_list_data(self, ids):
+        """Функция получения данных объектов списка в порядке ids."""
+        objects = self.get_queryset().in_bulk(ids)
+        serializer = self.get_serializer(
+            [objects[pk] for pk in ids if pk in objects], many=True)
+        return serializer.data
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: kwargs[lookup]})
+        rows = list(self.get_fingerprint_rows(queryset))
+        get_response = partial(super().retrieve, request, *args, **kwargs)
+        if not rows:
+            return get_response()
+        etag, last_modified = self.get_validators(rows, dated=True)
+        return conditional_response(
+            request, etag, last_modified, get_response)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(
+            self.queryset.only(*self.page_fields))
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            ids, extra = list(queryset.values_list('pk', flat=True)), None
+        else:
+            ids = [obj.pk for obj in page]
+            extra = self.paginator.get_page_signature()
+        rows = self.get_page_rows(ids)
+
+        def get_response():
+            data = self.get_list_data([row['id'] for row in rows])
+            if extra is None:
+                return Response(data)
+            return self.get_paginated_response(data)
+
+        etag, last_modified = self.get_validators(rows, extra)
+        return conditional_response(
+            request, etag, last_modified, get_response)
+
+
+class AnonymousListCacheMixin:
+    """Миксин кеширования первых страниц списка для анонимных
+    пользователей. Ключ строится из нормализованных параметров запроса
+    и поколений объектов, от которых зависит страница; поколения
+    меняются сигналами при записи, поэтому кеш сбрасывается сразу,
+    а не по истечении RECIPE_LIST_CACHE_TIMEOUT."""
+    list_cache_params = ()
+
+    def get_list_cache_generations(self, request):
+        raise NotImplementedError
+
+    def get_list_cache_key(self, request):
+        params = request.query_params
+        if not set(params) <= set(self.list_cache_params):
+            return None
+        page = params.get('page', '1')
+        if not page.isdigit() or int(page) > settings.RECIPE_LIST_CACHE_PAGES:
+            return None
+        generations = self.get_list_cache_generations(request)
+        if generations is None:
+            return None
+        normalized = sorted(
+            (name, sorted(set(params.getlist(name)))) for name in params)
+        digest = hashlib.md5(repr(normalized).encode()).hexdigest()
+        generations = '-'.join(map(str, generations))
+        return f'{self.basename}:list:{generations}:{digest}'
+
+    def list(self, request, *args, **kwargs):
+        key = None
+        if not request.user.is_authenticated:
+            key = self.get_list_cache_key(request)
+        if key is None:
+            return super().list(request, *args, **kwargs)
+        cached = cache.get(key)
+        if cached is None:
+            response = super().list(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cached = (
+                    response.data,
+                    response.get('ETag'),
+                    response.get('Last-Modified')
+                )
+                cache.set(key, cached, settings.RECIPE_LIST_CACHE_TIMEOUT)
+            return response
+        data, etag, last_modified = cached
+        return conditional_response(
+            request,
+            etag,
+            last_modified and parse_http_date_safe(last_modified),
+            partial(Response, data)
+        )
+
+
+class SparseFieldsMixin:
+    """Миксин выбора полей ответа параметрами запроса fields и expand.
+    fields - перечень полей через запятую, expand - вложенных объектов
+    из expandable_fields. Без fields отдаются все простые поля, без
+    expand - все вложенные, если не задан fields, иначе ни одного.
+    Без обоих параметров ответ не меняется."""
+    sparse_fields = ()
+    expandable_fields = ()
+
+    @staticmethod
+    def split_param(value):
+        return [name.strip() for name in value.split(',') if name.strip()]
+
+    @cached_property
+    def requested_fields(self):
+        """Запрошенные поля в порядке sparse_fields или None, если
+        нужны все поля."""
+        params = self.request.query_params
+        if 'fields' not in params and 'expand' not in params:
+            return None
+        if 'fields' in params:
+            fields = self.split_param(params['fields'])
+            expand = self.split_param(params.get('expand', ''))
+        else:
+            fields = [
+                name for name in self.sparse_fields
+                if name not in self.expandable_fields
+            ]
+            expand = self.split_param(params['expand'])
+        errors = {}
+        unknown = set(fields) - set(self.sparse_fields)
+        if unknown:
+            errors['fields'] = [
+                f'Неизвестные поля: {", ".join(sorted(unknown))}']
+        unknown = set(expand) - set(self.expandable_fields)
+        if unknown:
+            errors['expand'] = [
+                f'Неизвестные поля: {", ".join(sorted(unknown))}']
+        if errors:
+            raise serializers.ValidationError(errors)
+        requested = set(fields) | set(expand)
+        return tuple(
+            name for name in self.sparse_fields if name in requested)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.requested_fields
+        return context
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from users.models import User
 
 
@@ -40,6 +41,17 @@ class Ingredient(models.Model):
         verbose_name_plural = 'Ингредиенты'
 
 
+class RecipeQuerySet(models.QuerySet):
+
+    def touch(self, **fields):
+        """Функция смены версии рецептов вместе с обновлением полей."""
+        return self.update(
+            version=models.F('version') + 1,
+            updated_at=timezone.now(),
+            **fields
+        )
+
+
 class Recipe(models.Model):
     """Модель рецептов"""
     author = models.ForeignKey(
@@ -62,12 +74,49 @@ class Recipe(models.Model):
     )
     name = models.CharField(max_length=256, verbose_name='Название')
     image = models.ImageField(upload_to='recipe/', verbose_name='Изображение')
+    image_thumbnail = models.ImageField(
+        upload_to='recipe/thumbnail/',
+        blank=True,
+        verbose_name='Миниатюра изображения'
+    )
+    image_card = models.ImageField(
+        upload_to='recipe/card/',
+        blank=True,
+        verbose_name='Изображение для карточки'
+    )
+    image_variants_source = models.CharField(
+        max_length=100,
+        blank=True,
+        editable=False,
+        verbose_name='Изображение, из которого сделаны копии'
+    )
     text = models.TextField(verbose_name='Порядок приготовления')
     cooking_time = models.PositiveIntegerField(verbose_name='Время готовки')
     pub_date = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Дата публикации'
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Сколько раз добавлен в избранное'
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Сколько раз добавлен в корзину'
+    )
+    version = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+        verbose_name='Версия'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     def __str__(self):
         return f'{self.name}'
@@ -76,6 +125,12 @@ class Recipe(models.Model):
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ['-pub_date', ]
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_idx'
+            ),
+        ]
 
 
 class IngredientAmount(models.Model):
@@ -121,6 +176,12 @@ class TagRecipe(models.Model):
     class Meta:
         verbose_name = 'Тэг в рецепте'
         verbose_name_plural = 'Тэги в рецепте'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tag', 'recipe'],
+                name='unique_tag_recipe'
+            ),
+        ]
 
 
 class Follow(models.Model):
@@ -144,6 +205,12 @@ class Follow(models.Model):
     class Meta:
         verbose_name = 'Подписка на авторов'
         verbose_name_plural = 'Подписки на авторов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow'
+            ),
+        ]
 
 
 class Favorite(models.Model):
@@ -167,6 +234,12 @@ class Favorite(models.Model):
     class Meta:
         verbose_name = 'Избравнный рецепт'
         verbose_name_plural = 'Избранные рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_favorite'
+            ),
+        ]
 
 
 class ShoppingCart(models.Model):
@@ -190,3 +263,87 @@ class ShoppingCart(models.Model):
     class Meta:
         verbose_name = 'Корзина покупок'
         verbose_name_plural = 'Корзины покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_shopping_cart'
+            ),
+        ]
+
+
+class FeedEntry(models.Model):
+    """Модель ленты рецептов от авторов, на которых подписан пользователь.
+    Записи раскладываются подписчикам при публикации рецепта"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Пользователь'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    def __str__(self):
+        return f'{self.user}<--{self.recipe}'
+
+    class Meta:
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Лента подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='feed_user_pub_date_idx'
+            ),
+        ]
+
+
+class ShoppingListItem(models.Model):
+    """Модель списка покупок: суммарное количество каждого ингредиента
+    по рецептам корзины пользователя. Пересчитывается при изменении
+    корзины и ингредиентов рецептов из корзины"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Ингредиент'
+    )
+    total_amount = models.PositiveIntegerField(
+        verbose_name='Общее количество')
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Число рецептов с ингредиентом')
+
+    def __str__(self):
+        return f'{self.user}: {self.ingredient} - {self.total_amount}'
+
+    class Meta:
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Списки покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_item'
+            ),
+        ]
@@ -1,5 +1,189 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import hashlib
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import (BasePagination, CursorPagination,
+                                       PageNumberPagination)
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .cache import get_table_versions
+from .feed import get_feed
+
+
+def estimate_count(queryset):
+    """Функция оценки числа строк по плану запроса PostgreSQL.
+    Возвращает None, если оценка меньше порога и нужен точный COUNT."""
+    threshold = settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD
+    connection = connections[queryset.db]
+    if not threshold or connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    rows = plan[0]['Plan']['Plan Rows']
+    return rows if rows >= threshold else None
+
+
+class CachedCountPaginator(Paginator):
+    """Пагинатор, кеширующий число объектов по тексту запроса и версиям
+    задействованных в нем таблиц. Версии таблиц меняются при записи
+    в соответствующие модели, поэтому кеш не отдает устаревшее число
+    дольше, чем PAGINATION_COUNT_CACHE_TIMEOUT."""
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None:
+            return super().count
+        try:
+            sql, params = query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        tables = {alias.table_name for alias in query.alias_map.values()}
+        signature = repr((sql, params, get_table_versions(tables)))
+        key = 'count:' + hashlib.md5(signature.encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = estimate_count(self.object_list)
+            if count is None:
+                count = self.object_list.count()
+            cache.set(key, count, settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+        return count
 
 
 class CustomPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+    django_paginator_class = CachedCountPaginator
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Курсорная пагинация по дате публикации: без COUNT и OFFSET,
+    поэтому стоимость дальних страниц не растет."""
+    page_size = 6
+    page_size_query_param = 'limit'
+    ordering = ('-pub_date', '-id')
+
+
+class RecipePagination(CustomPagination):
+    """Постраничная пагинация рецептов, переключаемая на курсорную
+    параметром pagination=cursor или переданным курсором. Курсор
+    привязан к дате публикации, поэтому с поиском, упорядоченным
+    по релевантности, курсорная пагинация не используется."""
+    cursor_query_param = RecipeCursorPagination.cursor_query_param
+    cursor_search_message = (
+        'Курсорная пагинация недоступна при поиске: результаты поиска '
+        'упорядочены по релевантности, а не по дате.'
+    )
+
+    def __init__(self):
+        self.cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if (request.query_params.get('pagination') == 'cursor'
+                or self.cursor_query_param in request.query_params):
+            if request.query_params.get('search'):
+                raise ValidationError(
+                    {'pagination': [self.cursor_search_message]})
+            self.cursor_paginator = RecipeCursorPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_page_signature(self):
+        """Функция получения данных ответа помимо самих объектов
+        страницы: числа объектов и ссылок на соседние страницы."""
+        if self.cursor_paginator is not None:
+            return (
+                self.cursor_paginator.get_next_link(),
+                self.cursor_paginator.get_previous_link()
+            )
+        return (
+            self.page.paginator.count,
+            self.get_next_link(),
+            self.get_previous_link()
+        )
+
+
+class FeedPagination(BasePagination):
+    """Курсорная пагинация ленты подписок. Лента сливается из двух
+    источников, поэтому курсор хранит саму позицию: дату публикации
+    и id последнего рецепта страницы."""
+    page_size = 6
+    page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, settings.FEED_MAX_LENGTH)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            decoded = base64.urlsafe_b64decode(encoded.encode()).decode()
+            pub_date, recipe_id = decoded.split(' ')
+            position = parse_datetime(pub_date), int(recipe_id)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if position[0] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, position):
+        pub_date, recipe_id = position
+        encoded = f'{pub_date.isoformat()} {recipe_id}'.encode()
+        return base64.urlsafe_b64encode(encoded).decode()
+
+    def paginate_feed(self, request):
+        """Функция получения id рецептов текущей страницы ленты."""
+        self.request = request
+        page_size = self.get_page_size(request)
+        rows = get_feed(
+            request.user, self.decode_cursor(request), page_size + 1)
+        self.next_position = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            self.next_position = rows[-1]
+        return [recipe_id for pub_date, recipe_id in rows]
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.next_position)
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('results', data)
+        ]))
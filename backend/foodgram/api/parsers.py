@@ -0,0 +1,21 @@
+from django.conf import settings
+from rest_framework import exceptions, status
+from rest_framework.parsers import JSONParser
+
+
+class RequestTooLarge(exceptions.APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Слишком большой запрос.'
+    default_code = 'request_too_large'
+
+
+class LimitedJSONParser(JSONParser):
+    """JSON-парсер, отклоняющий запросы больше RECIPE_REQUEST_MAX_SIZE
+    до чтения тела запроса."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        meta = parser_context['request'].META
+        length = meta.get('CONTENT_LENGTH', meta.get('HTTP_CONTENT_LENGTH'))
+        if int(length or 0) > settings.RECIPE_REQUEST_MAX_SIZE:
+            raise RequestTooLarge
+        return super().parse(stream, media_type, parser_context)
@@ -0,0 +1,141 @@
+from collections import defaultdict
+
+from .context import get_user_context
+from .models import IngredientAmount, Recipe, TagRecipe
+from .serializers import RecipeReadSerializer
+
+AUTHOR_COLUMNS = (
+    'author_id', 'author__email', 'author__username', 'author__first_name',
+    'author__last_name', 'author__recipes_count', 'author__followers_count'
+)
+
+RECIPE_COLUMNS = {
+    'id': ('id',),
+    'author': AUTHOR_COLUMNS,
+    'name': ('name',),
+    'image': ('image',),
+    'image_thumbnail': ('image_thumbnail', 'image'),
+    'image_card': ('image_card', 'image'),
+    'text': ('text',),
+    'ingredients': (),
+    'tags': (),
+    'cooking_time': ('cooking_time',),
+    'is_favorited': ('is_favorited',),
+    'is_in_shopping_cart': ('is_in_shopping_cart',),
+    'favorites_count': ('favorites_count',),
+}
+
+NESTED_FIELDS = ('author', 'ingredients', 'tags')
+
+
+def get_columns(fields):
+    """Функция получения колонок рецепта, нужных для полей fields."""
+    columns = {'id': None}
+    for name in fields:
+        columns.update(dict.fromkeys(RECIPE_COLUMNS[name]))
+    return list(columns)
+
+
+def get_url(request, storage, name):
+    """Ссылка на файл, как ее отдает ImageField сериализатора."""
+    if not name:
+        return None
+    return request.build_absolute_uri(storage.url(name))
+
+
+class RecipeReader:
+    """Сборка списка рецептов из строк .values() без сериализаторов.
+
+    Ключи и их порядок совпадают с RecipeReadSerializer. Читаются
+    только колонки запрошенных полей fields (по умолчанию - всех):
+    автор - тем же запросом, ингредиенты и тэги - отдельными запросами,
+    только если они запрошены. Поле без метода get_<поле> берется
+    из строки как есть."""
+
+    def __init__(self, request, fields=None):
+        self.request = request
+        self.fields = fields or RecipeReadSerializer.Meta.fields
+        self.getters = [
+            (name, getattr(self, f'get_{name}', None))
+            for name in self.fields
+        ]
+        self.storage = Recipe._meta.get_field('image').storage
+
+    def read(self, queryset, ids):
+        """Функция чтения рецептов ids в том же порядке."""
+        rows = {
+            row['id']: row
+            for row in queryset.prefetch_related(None).filter(
+                pk__in=ids).values(*get_columns(self.fields))
+        }
+        if 'author' in self.fields:
+            self.following_ids = get_user_context(self.request).following_ids
+        if 'ingredients' in self.fields:
+            self.ingredients = self.read_ingredients(rows)
+        if 'tags' in self.fields:
+            self.tags = self.read_tags(rows)
+        return [
+            {
+                name: row[name] if getter is None else getter(row)
+                for name, getter in self.getters
+            }
+            for row in map(rows.get, ids) if row is not None
+        ]
+
+    @staticmethod
+    def read_ingredients(recipe_ids):
+        ingredients = defaultdict(list)
+        for recipe_id, pk, name, unit, amount in (
+            IngredientAmount.objects.filter(
+                recipe_id__in=recipe_ids
+            ).order_by('pk').values_list(
+                'recipe_id', 'ingredient_id', 'ingredient__name',
+                'ingredient__measurement_unit', 'amount'
+            )
+        ):
+            ingredients[recipe_id].append(
+                {'id': pk, 'name': name, 'measurement_unit': unit,
+                 'amount': amount})
+        return ingredients
+
+    @staticmethod
+    def read_tags(recipe_ids):
+        tags = defaultdict(list)
+        for recipe_id, pk, name, color, slug in TagRecipe.objects.filter(
+            recipe_id__in=recipe_ids
+        ).order_by('tag_id').values_list(
+            'recipe_id', 'tag_id', 'tag__name', 'tag__color', 'tag__slug'
+        ):
+            tags[recipe_id].append(
+                {'id': pk, 'name': name, 'color': color, 'slug': slug})
+        return tags
+
+    def get_author(self, row):
+        return {
+            'email': row['author__email'],
+            'id': row['author_id'],
+            'username': row['author__username'],
+            'first_name': row['author__first_name'],
+            'last_name': row['author__last_name'],
+            'is_subscribed': row['author_id'] in self.following_ids,
+            'recipes_count': row['author__recipes_count'],
+            'followers_count': row['author__followers_count'],
+        }
+
+    def get_image(self, row):
+        return get_url(self.request, self.storage, row['image'])
+
+    def get_image_thumbnail(self, row):
+        return get_url(
+            self.request, self.storage,
+            row['image_thumbnail'] or row['image'])
+
+    def get_image_card(self, row):
+        return get_url(
+            self.request, self.storage, row['image_card'] or row['image'])
+
+    def get_ingredients(self, row):
+        return self.ingredients[row['id']]
+
+    def get_tags(self, row):
+        return self.tags[row['id']]
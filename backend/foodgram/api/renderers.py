@@ -0,0 +1,27 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+LINE_SEPARATORS = (
+    ('\u2028'.encode(), b'\\u2028'),
+    ('\u2029'.encode(), b'\\u2029'),
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON-рендерер на orjson с тем же выводом, что у JSONRenderer.
+    Даты и прочие типы, которые orjson записывает иначе, передаются
+    кодировщику DRF; ответы с отступами (в том числе для Browsable API)
+    рендерятся стандартно."""
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if (data is None or indent is not None or self.ensure_ascii
+                or not self.compact):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(
+            data, default=self.encoder_class().default, option=self.options)
+        for separator, escaped in LINE_SEPARATORS:
+            if separator in ret:
+                ret = ret.replace(separator, escaped)
+        return ret
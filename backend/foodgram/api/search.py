@@ -0,0 +1,101 @@
+import re
+
+from django.db import connections
+from django.db.models import Case, FloatField, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from .expressions import RawSubquery
+
+WORDS = re.compile(r'\w+')
+
+POSTGRES_QUERY = "plainto_tsquery('russian', %s)"
+POSTGRES_MATCH = (
+    f'SELECT id FROM api_recipe WHERE search_vector @@ {POSTGRES_QUERY}'
+)
+POSTGRES_RANK = f'ts_rank(api_recipe.search_vector, {POSTGRES_QUERY})'
+
+SQLITE_MATCH = 'SELECT rowid FROM api_recipe_fts WHERE api_recipe_fts MATCH %s'
+SQLITE_RANK = (
+    'SELECT -bm25(api_recipe_fts, 10.0, 1.0) FROM api_recipe_fts '
+    'WHERE api_recipe_fts MATCH %s AND rowid = api_recipe.id'
+)
+SQLITE_TRIGGERS = (
+    'CREATE TRIGGER IF NOT EXISTS api_recipe_fts_insert '
+    'AFTER INSERT ON api_recipe BEGIN '
+    'INSERT INTO api_recipe_fts (rowid, name, text) '
+    'VALUES (new.id, new.name, new.text); END',
+    'CREATE TRIGGER IF NOT EXISTS api_recipe_fts_update '
+    'AFTER UPDATE OF name, text ON api_recipe BEGIN '
+    'UPDATE api_recipe_fts SET name = new.name, text = new.text '
+    'WHERE rowid = old.id; END',
+    'CREATE TRIGGER IF NOT EXISTS api_recipe_fts_delete '
+    'AFTER DELETE ON api_recipe BEGIN '
+    'DELETE FROM api_recipe_fts WHERE rowid = old.id; END',
+)
+
+
+def get_vendor(queryset):
+    return connections[queryset.db].vendor
+
+
+def search_postgresql(queryset, query):
+    return queryset.filter(
+        id__in=RawSubquery(POSTGRES_MATCH, (query,))
+    ).annotate(
+        search_rank=RawSQL(POSTGRES_RANK, (query,), FloatField())
+    )
+
+
+def search_sqlite(queryset, query):
+    terms = ' '.join(f'"{word}"*' for word in WORDS.findall(query))
+    return queryset.filter(
+        id__in=RawSubquery(SQLITE_MATCH, (terms,))
+    ).annotate(
+        search_rank=RawSQL(SQLITE_RANK, (terms,), FloatField())
+    )
+
+
+def search_fallback(queryset, query):
+    return queryset.filter(
+        Q(name__icontains=query) | Q(text__icontains=query)
+    ).annotate(
+        search_rank=Case(
+            When(name__icontains=query, then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField()
+        )
+    )
+
+
+SEARCH_BACKENDS = {
+    'postgresql': search_postgresql,
+    'sqlite': search_sqlite,
+}
+
+
+def search_recipes(queryset, query):
+    """Функция полнотекстового поиска рецептов по названию и описанию.
+    Совпадения в названии весят больше, результаты упорядочены
+    по релевантности, затем по дате публикации."""
+    if not WORDS.search(query):
+        return queryset.none()
+    backend = SEARCH_BACKENDS.get(get_vendor(queryset), search_fallback)
+    return backend(queryset, query).order_by(
+        '-search_rank', '-pub_date', '-id')
+
+
+def install_sqlite_triggers(connection):
+    """Функция создания триггеров, поддерживающих таблицу FTS5
+    в актуальном состоянии. SQLite удаляет триггеры при пересоздании
+    таблицы в миграциях, поэтому функция вызывается и после них."""
+    with connection.cursor() as cursor:
+        for trigger in SQLITE_TRIGGERS:
+            cursor.execute(trigger)
+
+
+def restore_sqlite_triggers(using):
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    if 'api_recipe_fts' in connection.introspection.table_names():
+        install_sqlite_triggers(connection)
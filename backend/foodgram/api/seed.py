@@ -0,0 +1,158 @@
+import random
+import tempfile
+from contextlib import contextmanager
+from io import BytesIO
+
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test.utils import (override_settings, setup_test_environment,
+                               teardown_test_environment)
+from PIL import Image
+from users.models import User
+
+from .counters import reconcile_all
+from .feed import rebuild_feed
+from .models import (Favorite, Follow, Ingredient, IngredientAmount, Recipe,
+                     ShoppingCart, Tag, TagRecipe)
+from .shopping_list import fill_shopping_lists
+
+WORDS = (
+    'суп', 'борщ', 'салат', 'пирог', 'каша', 'рагу', 'омлет', 'паста',
+    'курица', 'говядина', 'рыба', 'грибы', 'сыр', 'томаты', 'картофель',
+    'морковь', 'лук', 'чеснок', 'укроп', 'сметана', 'запеченный',
+    'жареный', 'тушеный', 'домашний', 'быстрый', 'праздничный'
+)
+UNITS = ('г', 'кг', 'мл', 'л', 'шт.', 'ст. л.', 'ч. л.', 'по вкусу')
+
+
+def make_image():
+    buffer = BytesIO()
+    Image.new('RGB', (640, 480), 'orange').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+DATASET_OPTIONS = {
+    'users': (200, 'Число пользователей'),
+    'recipes': (5, 'Рецептов на пользователя'),
+    'ingredients': (8, 'Ингредиентов в рецепте'),
+    'catalog': (2000, 'Ингредиентов в справочнике'),
+    'tags': (6, 'Число тэгов'),
+    'follows': (20, 'Подписок на пользователя'),
+    'favorites': (20, 'Рецептов в избранном на пользователя'),
+    'carts': (5, 'Рецептов в корзине на пользователя'),
+}
+
+
+def add_dataset_arguments(parser):
+    """Функция добавления к команде параметров набора данных."""
+    dataset = parser.add_argument_group('Набор данных')
+    for name, (default, help_text) in DATASET_OPTIONS.items():
+        dataset.add_argument(
+            f'--{name}', type=int, default=default, help=help_text)
+    dataset.add_argument(
+        '--seed', type=int, default=0,
+        help='Начальное значение генератора случайных данных')
+
+
+@contextmanager
+def temporary_database():
+    """Контекстный менеджер тестовой БД (SQLite в памяти или test_<имя>
+    на PostgreSQL) и временного MEDIA_ROOT: рабочая БД и файлы
+    не затрагиваются."""
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False)
+    try:
+        with tempfile.TemporaryDirectory() as media_root:
+            with override_settings(
+                MEDIA_ROOT=media_root,
+                RECIPE_IMAGE_ASYNC=False
+            ):
+                yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def seed(options):
+    """Функция заполнения тестовой БД пакетными INSERT. Сигналы
+    при этом не вызываются, поэтому счетчики, ленты и списки
+    покупок затем пересчитываются целиком."""
+    rng = random.Random(options['seed'])
+    Tag.objects.bulk_create(
+        Tag(name=f'Тэг {i}', slug=f'tag{i}', color=f'#{i:06X}')
+        for i in range(options['tags'])
+    )
+    Ingredient.objects.bulk_create(
+        Ingredient(
+            name=f'{rng.choice(WORDS)} {i}',
+            measurement_unit=rng.choice(UNITS)
+        )
+        for i in range(options['catalog'])
+    )
+    image = Recipe._meta.get_field('image').storage.save(
+        'recipe/benchmark.png', ContentFile(make_image()))
+    password = make_password(None)
+    User.objects.bulk_create(
+        User(
+            username=f'user{i}',
+            email=f'user{i}@example.com',
+            first_name=f'Имя{i}',
+            last_name=f'Фамилия{i}',
+            password=password
+        )
+        for i in range(options['users'])
+    )
+    user_ids = list(User.objects.order_by('pk').values_list(
+        'pk', flat=True))
+    Recipe.objects.bulk_create(
+        Recipe(
+            author_id=user_id,
+            name=' '.join(rng.choices(WORDS, k=3)),
+            text=' '.join(rng.choices(WORDS, k=60)),
+            image=image,
+            cooking_time=rng.randint(5, 180)
+        )
+        for user_id in user_ids
+        for _ in range(options['recipes'])
+    )
+    tag_ids = list(Tag.objects.values_list('pk', flat=True))
+    ingredient_ids = list(Ingredient.objects.values_list('pk', flat=True))
+    recipe_ids = list(Recipe.objects.values_list('pk', flat=True))
+    TagRecipe.objects.bulk_create(
+        TagRecipe(tag_id=tag_id, recipe_id=recipe_id)
+        for recipe_id in recipe_ids
+        for tag_id in rng.sample(tag_ids, min(2, len(tag_ids)))
+    )
+    IngredientAmount.objects.bulk_create(
+        IngredientAmount(
+            ingredient_id=ingredient_id,
+            recipe_id=recipe_id,
+            amount=rng.randint(1, 500)
+        )
+        for recipe_id in recipe_ids
+        for ingredient_id in rng.sample(
+            ingredient_ids, options['ingredients'])
+    )
+    for model, targets, count in (
+        (Favorite, recipe_ids, options['favorites']),
+        (ShoppingCart, recipe_ids, options['carts']),
+    ):
+        model.objects.bulk_create(
+            model(user_id=user_id, recipe_id=recipe_id)
+            for user_id in user_ids
+            for recipe_id in rng.sample(targets, count)
+        )
+    Follow.objects.bulk_create(
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id in user_ids
+        for author_id in rng.sample(
+            [pk for pk in user_ids if pk != user_id], options['follows'])
+    )
+    reconcile_all(apps)
+    fill_shopping_lists(apps)
+    for user_id in user_ids:
+        rebuild_feed(user_id)
@@ -1,11 +1,13 @@
-from django.shortcuts import get_object_or_404
-from drf_extra_fields.fields import Base64ImageField
+from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers
-from users.models import User
 from users.serializers import MyUserSerializer
 
-from .models import (Favorite, Ingredient, IngredientAmount, Recipe,
-                     ShoppingCart, Tag, TagRecipe)
+from .context import get_user_context
+from .fields import ImageVariantField, StreamingBase64ImageField
+from .models import Ingredient, IngredientAmount, Recipe, Tag, TagRecipe
+from .shopping_list import recipe_changed
+from .utils import delete_rows
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -48,7 +50,7 @@ class IngredientAmountCreateSerializer(serializers.ModelSerializer):
 
 
 class BaseRecipeSerializer(serializers.ModelSerializer):
-    image = Base64ImageField()
+    image = StreamingBase64ImageField()
     author = MyUserSerializer(read_only=True)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
@@ -57,23 +59,29 @@ class BaseRecipeSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = ('is_favorited', 'is_in_shopping_cart')
 
+    def save(self, **kwargs):
+        try:
+            return super().save(**kwargs)
+        finally:
+            image = self.validated_data.get('image')
+            if image is not None:
+                image.close()
+
     def get_is_favorited(self, obj):
         """Функция проверки добавления текущим пользователем
         рецепта в избранное."""
-        username = self.context['request'].user
-        if not username.is_authenticated:
-            return False
-        user = get_object_or_404(User, username=username)
-        return Favorite.objects.filter(user=user, recipe=obj).exists()
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
+        context = get_user_context(self.context['request'])
+        return obj.pk in context.favorite_ids
 
     def get_is_in_shopping_cart(self, obj):
         """Функция проверки добавления текущим пользователем
         рецепта в лист покупок."""
-        username = self.context['request'].user
-        if not username.is_authenticated:
-            return False
-        user = get_object_or_404(User, username=username)
-        return ShoppingCart.objects.filter(user=user, recipe=obj).exists()
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
+        context = get_user_context(self.context['request'])
+        return obj.pk in context.cart_ids
 
 
 class RecipeSerializer(BaseRecipeSerializer):
@@ -93,23 +101,88 @@ class RecipeSerializer(BaseRecipeSerializer):
                   'tags', 'cooking_time', 'is_favorited',
                   'is_in_shopping_cart')
 
+    @staticmethod
+    def get_amounts(ing_list):
+        """Функция сведения ингредиентов рецепта в словарь
+        id ингредиента -> количество."""
+        amounts = {}
+        for ing in ing_list:
+            ingredient_id = ing['id'].pk
+            amounts[ingredient_id] = (
+                amounts.get(ingredient_id, 0) + ing['amount'])
+        return amounts
+
+    @transaction.atomic
     def create(self, validated_data):
         ing_list = validated_data.pop('ingredientamount_set')
         tag_list = validated_data.pop('tags')
         recipe = Recipe.objects.create(**validated_data)
-        for tag_pk in tag_list:
-            TagRecipe.objects.create(tag=tag_pk, recipe=recipe)
-        recipe_ings = [
+        TagRecipe.objects.bulk_create(
+            TagRecipe(tag_id=tag_id, recipe=recipe)
+            for tag_id in {tag.pk for tag in tag_list}
+        )
+        IngredientAmount.objects.bulk_create(
             IngredientAmount(
-                ingredient=ing['id'],
+                ingredient_id=ingredient_id,
                 recipe=recipe,
-                amount=ing['amount']
+                amount=amount
             )
-            for ing in ing_list
-        ]
-        IngredientAmount.objects.bulk_create(recipe_ings)
+            for ingredient_id, amount in self.get_amounts(ing_list).items()
+        )
         return recipe
 
+    @staticmethod
+    def update_tags(recipe, tag_list):
+        """Функция изменения тэгов рецепта: удаляются и добавляются
+        только отличающиеся от текущих тэги."""
+        new_ids = {tag.pk for tag in tag_list}
+        old_ids = set(
+            TagRecipe.objects.filter(recipe=recipe).values_list(
+                'tag_id', flat=True)
+        )
+        if old_ids - new_ids:
+            TagRecipe.objects.filter(
+                recipe=recipe, tag_id__in=old_ids - new_ids).delete()
+        TagRecipe.objects.bulk_create(
+            TagRecipe(tag_id=tag_id, recipe=recipe)
+            for tag_id in new_ids - old_ids
+        )
+
+    def update_ingredients(self, recipe, ing_list):
+        """Функция изменения ингредиентов рецепта: удаляются, изменяются
+        и добавляются только отличающиеся от текущих записи. Пакетные
+        изменения, в том числе удаление, не вызывают сигналов, поэтому
+        списки покупок пересчитываются явно одним вызовом."""
+        amounts = self.get_amounts(ing_list)
+        to_delete, to_update, existing = [], [], set()
+        changed = set()
+        for ing in IngredientAmount.objects.filter(recipe=recipe):
+            if (ing.ingredient_id not in amounts
+                    or ing.ingredient_id in existing):
+                to_delete.append(ing.pk)
+                changed.add(ing.ingredient_id)
+                continue
+            existing.add(ing.ingredient_id)
+            if ing.amount != amounts[ing.ingredient_id]:
+                ing.amount = amounts[ing.ingredient_id]
+                to_update.append(ing)
+        delete_rows(IngredientAmount, to_delete)
+        if to_update:
+            IngredientAmount.objects.bulk_update(to_update, ['amount'])
+        IngredientAmount.objects.bulk_create(
+            IngredientAmount(
+                ingredient_id=ingredient_id,
+                recipe=recipe,
+                amount=amount
+            )
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in existing
+        )
+        changed.update(ing.ingredient_id for ing in to_update)
+        changed.update(pk for pk in amounts if pk not in existing)
+        recipe_changed(recipe.pk, changed)
+
+    @transaction.atomic
     def update(self, instance, validated_data):
         ing_list = validated_data.pop('ingredientamount_set')
         tag_list = validated_data.pop('tags')
@@ -118,19 +191,8 @@ class RecipeSerializer(BaseRecipeSerializer):
             'cooking_time', instance.cooking_time)
         instance.text = validated_data.get('text', instance.text)
         instance.image = validated_data.get('image', instance.image)
-        TagRecipe.objects.filter(recipe=instance).delete()
-        IngredientAmount.objects.filter(recipe=instance).delete()
-        for tag_pk in tag_list:
-            TagRecipe.objects.create(tag=tag_pk, recipe=instance)
-        recipe_ings = [
-            IngredientAmount(
-                ingredient=ing['id'],
-                recipe=instance,
-                amount=ing['amount']
-            )
-            for ing in ing_list
-        ]
-        IngredientAmount.objects.bulk_create(recipe_ings)
+        self.update_tags(instance, tag_list)
+        self.update_ingredients(instance, ing_list)
         instance.save()
         return instance
 
@@ -142,15 +204,36 @@ class RecipeSerializer(BaseRecipeSerializer):
 
 
 class RecipeReadSerializer(BaseRecipeSerializer):
-    """Класс сериализатора рецептов."""
+    """Класс сериализатора рецептов. Поля ответа можно ограничить
+    перечнем fields в контексте."""
     ingredients = IngredientAmountSerializer(
         source='ingredientamount_set',
         many=True
     )
     tags = TagSerializer(many=True)
+    image_thumbnail = ImageVariantField()
+    image_card = ImageVariantField()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
     class Meta:
         model = Recipe
-        fields = ('id', 'author', 'name', 'image', 'text', 'ingredients',
-                  'tags', 'cooking_time', 'is_favorited',
-                  'is_in_shopping_cart')
+        fields = ('id', 'author', 'name', 'image', 'image_thumbnail',
+                  'image_card', 'text', 'ingredients', 'tags',
+                  'cooking_time', 'is_favorited', 'is_in_shopping_cart',
+                  'favorites_count')
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Класс сериализатора списка id рецептов для пакетного
+    добавления в избранное и корзину покупок и удаления из них."""
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.RECIPE_BATCH_MAX_SIZE
+    )
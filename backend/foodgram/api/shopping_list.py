@@ -0,0 +1,109 @@
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from users.models import User
+
+from .models import IngredientAmount, ShoppingCart, ShoppingListItem
+
+
+def aggregate(ingredient_amount, filters):
+    """Запрос сумм ингредиентов по рецептам корзин: строки
+    (пользователь, ингредиент, количество, число рецептов)."""
+    return ingredient_amount.objects.filter(**filters).values_list(
+        'recipe__shoppingcart__user_id', 'ingredient_id'
+    ).annotate(
+        total=Sum('amount'),
+        recipes=Count('recipe', distinct=True)
+    ).order_by()
+
+
+def refresh_items(user_ids, ingredient_ids=None):
+    """Функция пересчета строк списков покупок пользователей по
+    ингредиентам ingredient_ids, по умолчанию - по всем. Записываются
+    только изменившиеся строки. Пересчет не зависит от порядка
+    изменений, поэтому повторный вызов ничего не портит, а строки
+    пользователя блокируются, чтобы параллельные запросы
+    не перезаписали результат друг друга."""
+    user_ids = set(user_ids)
+    if ingredient_ids is not None:
+        ingredient_ids = set(ingredient_ids)
+    if not user_ids or ingredient_ids == set():
+        return
+    filters = {'recipe__shoppingcart__user_id__in': user_ids}
+    items = ShoppingListItem.objects.filter(user_id__in=user_ids)
+    if ingredient_ids is not None:
+        filters['ingredient_id__in'] = ingredient_ids
+        items = items.filter(ingredient_id__in=ingredient_ids)
+    with transaction.atomic():
+        list(User.objects.select_for_update().filter(
+            pk__in=user_ids).order_by('pk').values_list('pk', flat=True))
+        existing = {(item.user_id, item.ingredient_id): item for item in items}
+        to_update, to_create = [], []
+        for user_id, ingredient_id, total, recipes in aggregate(
+                IngredientAmount, filters):
+            item = existing.pop((user_id, ingredient_id), None)
+            if item is None:
+                to_create.append(ShoppingListItem(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    total_amount=total,
+                    recipes_count=recipes
+                ))
+            elif (item.total_amount, item.recipes_count) != (total, recipes):
+                item.total_amount, item.recipes_count = total, recipes
+                to_update.append(item)
+        if existing:
+            ShoppingListItem.objects.filter(
+                pk__in=[item.pk for item in existing.values()]).delete()
+        if to_update:
+            ShoppingListItem.objects.bulk_update(
+                to_update, ['total_amount', 'recipes_count'])
+        ShoppingListItem.objects.bulk_create(to_create)
+
+
+def cart_changed(user_id, recipe_ids):
+    """Пересчет списка покупок после добавления рецептов в корзину
+    или удаления из нее."""
+    refresh_items([user_id], IngredientAmount.objects.filter(
+        recipe_id__in=recipe_ids).values_list('ingredient_id', flat=True))
+
+
+def recipe_changed(recipe_id, ingredient_ids=None):
+    """Пересчет списков покупок всех, у кого рецепт в корзине,
+    после изменения его ингредиентов."""
+    refresh_items(
+        ShoppingCart.objects.filter(
+            recipe_id=recipe_id).values_list('user_id', flat=True),
+        ingredient_ids
+    )
+
+
+def get_shopping_list(user):
+    """Функция чтения списка покупок пользователя одним запросом
+    по индексу (пользователь, ингредиент)."""
+    return ShoppingListItem.objects.filter(user=user).values(
+        'ingredient__name',
+        'ingredient__measurement_unit',
+        total=F('total_amount')
+    ).order_by('ingredient__name')
+
+
+def fill_shopping_lists(apps):
+    """Функция пересборки всех списков покупок по корзинам.
+    Возвращает число записанных строк."""
+    item_model = apps.get_model('api', 'ShoppingListItem')
+    item_model.objects.all().delete()
+    items = item_model.objects.bulk_create(
+        (
+            item_model(
+                user_id=user_id,
+                ingredient_id=ingredient_id,
+                total_amount=total,
+                recipes_count=recipes
+            )
+            for user_id, ingredient_id, total, recipes in aggregate(
+                apps.get_model('api', 'IngredientAmount'),
+                {'recipe__shoppingcart__isnull': False}
+            )
+        )
+    )
+    return len(items)
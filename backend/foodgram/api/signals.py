@@ -0,0 +1,198 @@
+from django.apps import apps
+from django.db.models import F
+from django.db.models.expressions import Combinable
+from django.db.models.signals import (post_delete, post_migrate, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from .cache import (bump_catalog_version, bump_table_version,
+                    schedule_generations_bump)
+from .counters import COUNTERS, change_counter
+from .feed import fan_out, follow_author, unfollow_author
+from .images import schedule_variants
+from .models import (Favorite, Follow, Ingredient, IngredientAmount, Recipe,
+                     ShoppingCart, Tag, TagRecipe)
+from .search import restore_sqlite_triggers
+from .shopping_list import cart_changed, recipe_changed, refresh_items
+
+
+def get_signal_counters():
+    """Функция группировки счетчиков по моделям связей: одна запись
+    связи может менять несколько счетчиков."""
+    counters = {}
+    for model, counter, related, field in COUNTERS:
+        counters.setdefault(apps.get_model(related), []).append(
+            (apps.get_model(model), f'{field}_id', counter))
+    return counters
+
+
+SIGNAL_COUNTERS = get_signal_counters()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_catalog_cache(**kwargs):
+    """Смена версии справочников при изменении тэгов и ингредиентов."""
+    bump_catalog_version()
+
+
+@receiver(pre_save, sender=Recipe)
+def bump_recipe_version(instance, **kwargs):
+    """Смена версии рецепта при каждом сохранении. Версия меняется
+    выражением F() в самом UPDATE, а не в памяти: иначе save()
+    запишет прочитанное значение поверх смен версии, сделанных
+    touch() в той же транзакции."""
+    if instance.pk is not None:
+        instance.version = F('version') + 1
+
+
+@receiver(post_save, sender=Recipe)
+def refresh_recipe_version(instance, **kwargs):
+    """Замена выражения F() в сохраненном рецепте записанной версией."""
+    if isinstance(instance.version, Combinable):
+        instance.refresh_from_db(fields=('version',))
+
+
+@receiver((post_save, post_delete), sender=TagRecipe)
+@receiver((post_save, post_delete), sender=IngredientAmount)
+def touch_recipe(instance, **kwargs):
+    """Смена версии рецепта при изменении его тэгов и ингредиентов."""
+    Recipe.objects.filter(pk=instance.recipe_id).touch()
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def invalidate_recipe_lists(instance, signal, created=False, **kwargs):
+    """Сброс закешированных списков рецептов при изменении рецепта.
+    Добавление и удаление рецепта меняют число рецептов автора,
+    которое выводится во всех его рецептах."""
+    if created or signal is post_delete:
+        schedule_generations_bump(
+            TagRecipe.objects.filter(recipe__author_id=instance.author_id))
+    else:
+        schedule_generations_bump(
+            TagRecipe.objects.filter(recipe_id=instance.pk))
+
+
+@receiver((post_save, post_delete), sender=TagRecipe)
+@receiver((post_save, post_delete), sender=IngredientAmount)
+def invalidate_related_recipe_lists(instance, **kwargs):
+    tag_ids = [instance.tag_id] if isinstance(instance, TagRecipe) else []
+    schedule_generations_bump(
+        TagRecipe.objects.filter(recipe_id=instance.recipe_id), tag_ids)
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+def invalidate_favorite_recipe_lists(instance, **kwargs):
+    """Сброс списков с рецептом, у которого изменилось число
+    добавлений в избранное."""
+    schedule_generations_bump(
+        TagRecipe.objects.filter(recipe_id=instance.recipe_id))
+
+
+@receiver((post_save, post_delete), sender=Follow)
+def invalidate_author_recipe_lists(instance, **kwargs):
+    """Сброс списков с рецептами автора, у которого изменилось
+    число подписчиков."""
+    schedule_generations_bump(
+        TagRecipe.objects.filter(recipe__author_id=instance.author_id))
+
+
+@receiver(post_save, sender=Tag)
+def touch_tag_recipes(instance, created, **kwargs):
+    if not created:
+        Recipe.objects.filter(tags=instance).touch()
+
+
+@receiver(post_save, sender=Ingredient)
+def touch_ingredient_recipes(instance, created, **kwargs):
+    if not created:
+        Recipe.objects.filter(ingredients=instance).touch()
+
+
+@receiver(post_save, sender=Recipe)
+def build_image_variants(instance, **kwargs):
+    """Создание уменьшенных копий нового изображения рецепта."""
+    schedule_variants(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def add_to_feeds(instance, created, **kwargs):
+    """Запись нового рецепта в ленты подписчиков автора."""
+    if created:
+        fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def add_author_to_feed(instance, created, **kwargs):
+    if created:
+        follow_author(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def remove_author_from_feed(instance, **kwargs):
+    unfollow_author(instance)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def update_shopping_list(instance, created, **kwargs):
+    """Пересчет списка покупок при добавлении рецепта в корзину."""
+    if created:
+        cart_changed(instance.user_id, [instance.recipe_id])
+    else:
+        refresh_items([instance.user_id])
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def remove_from_shopping_list(instance, **kwargs):
+    cart_changed(instance.user_id, [instance.recipe_id])
+
+
+@receiver(post_save, sender=IngredientAmount)
+def update_shopping_lists(instance, created, **kwargs):
+    """Пересчет списков покупок при изменении ингредиентов рецепта:
+    у измененной записи мог смениться ингредиент, поэтому списки
+    пересчитываются целиком."""
+    recipe_changed(
+        instance.recipe_id, [instance.ingredient_id] if created else None)
+
+
+@receiver(post_delete, sender=IngredientAmount)
+def remove_from_shopping_lists(instance, **kwargs):
+    recipe_changed(instance.recipe_id, [instance.ingredient_id])
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, using, **kwargs):
+    """Восстановление триггеров поиска на SQLite после миграций."""
+    if sender.name == 'api':
+        restore_sqlite_triggers(using)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Follow)
+@receiver(post_save, sender=Recipe)
+def increment_counter(sender, instance, created, **kwargs):
+    """Увеличение счетчика при создании избранного, корзины,
+    подписки или рецепта."""
+    if created:
+        for model, field, counter in SIGNAL_COUNTERS[sender]:
+            change_counter(model, getattr(instance, field), counter, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Follow)
+@receiver(post_delete, sender=Recipe)
+def decrement_counter(sender, instance, **kwargs):
+    """Уменьшение счетчика при удалении избранного, корзины,
+    подписки или рецепта."""
+    for model, field, counter in SIGNAL_COUNTERS[sender]:
+        change_counter(model, getattr(instance, field), counter, -1)
+
+
+@receiver((post_save, post_delete))
+def invalidate_counts(sender, **kwargs):
+    """Смена версии таблицы для сброса закешированных COUNT."""
+    if sender._meta.app_label in ('api', 'users'):
+        bump_table_version(sender._meta.db_table)
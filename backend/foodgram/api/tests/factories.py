@@ -0,0 +1,40 @@
+from api.models import Ingredient, IngredientAmount, Recipe
+from users.models import User
+
+
+def make_user(name):
+    return User.objects.create(
+        username=name, email=f'{name}@example.com',
+        first_name=name, last_name=name
+    )
+
+
+def make_recipe(author, amounts=None, **fields):
+    """Создание рецепта с ингредиентами {ингредиент: количество}."""
+    recipe = Recipe.objects.create(
+        author=author,
+        name=fields.pop('name', 'Рецепт'),
+        text=fields.pop('text', 'Текст'),
+        image=fields.pop('image', 'recipe/test.png'),
+        cooking_time=10,
+        **fields
+    )
+    for ingredient, amount in (amounts or {}).items():
+        IngredientAmount.objects.create(
+            recipe=recipe, ingredient=ingredient, amount=amount)
+    return recipe
+
+
+def make_ingredients(*names):
+    return [
+        Ingredient.objects.create(name=name, measurement_unit='г')
+        for name in names
+    ]
+
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tests',
+    }
+}
@@ -0,0 +1,39 @@
+from api.autocomplete import IngredientIndex
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from .factories import LOCMEM_CACHES, make_ingredients
+
+NAMES = ('basalt', 'sea salt', 'salted butter', 'Salmon', 'salt', 'pepper')
+EXPECTED = ['Salmon', 'salt', 'salted butter', 'sea salt', 'basalt']
+
+
+@override_settings(CACHES=LOCMEM_CACHES, INGREDIENT_INDEX_ASYNC=False)
+class IngredientIndexTests(TestCase):
+    """Индекс в памяти и поиск по базе данных ранжируют одинаково:
+    начало названия, начало слова, вхождение в середину слова."""
+
+    def setUp(self):
+        cache.clear()
+        make_ingredients(*NAMES)
+        self.index = IngredientIndex()
+
+    def names(self, query, limit=None):
+        return [
+            entry['name'] for entry in self.index.search(query, limit)]
+
+    def test_ranking(self):
+        self.assertEqual(self.names(' SAL '), EXPECTED)
+        self.assertEqual(self.names('sal', limit=3), EXPECTED[:3])
+        self.assertEqual(self.names('salted b'), ['salted butter'])
+
+    @override_settings(INGREDIENT_INDEX_MAX_SIZE=0)
+    def test_database_fallback(self):
+        self.assertEqual(self.names('sal'), EXPECTED)
+        self.assertEqual(self.names('sal', limit=4), EXPECTED[:4])
+        self.assertIsNone(self.index._state)
+
+    def test_rebuilds_on_catalog_change(self):
+        self.assertEqual(self.names('pep'), ['pepper'])
+        make_ingredients('pepperoni')
+        self.assertEqual(self.names('pep'), ['pepper', 'pepperoni'])
@@ -0,0 +1,74 @@
+from api.counters import reconcile_all
+from api.models import (Favorite, IngredientAmount, Recipe, ShoppingCart,
+                        ShoppingListItem)
+from api.shopping_list import aggregate
+from django.apps import apps
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .factories import make_ingredients, make_recipe, make_user
+
+
+class BatchTests(TestCase):
+    """Пакетное добавление и удаление возвращает итог по каждому id
+    и оставляет счетчики и список покупок согласованными."""
+
+    def setUp(self):
+        self.user = make_user('reader')
+        self.author = make_user('author')
+        flour, sugar = make_ingredients('мука', 'сахар')
+        self.recipes = [
+            make_recipe(self.author, {flour: 100, sugar: i + 1},
+                        name=f'Рецепт {i}')
+            for i in range(3)
+        ]
+        self.ids = [recipe.pk for recipe in self.recipes]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def counts(self, field):
+        return list(Recipe.objects.filter(pk__in=self.ids).order_by(
+            'pk').values_list(field, flat=True))
+
+    def statuses(self, method, ids, url='/api/recipes/favorite/'):
+        response = getattr(self.client, method)(
+            url, {'recipes': ids}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return [item['status'] for item in response.data]
+
+    def assert_no_drift(self):
+        self.assertEqual(
+            set(reconcile_all(apps, dry_run=True).values()), {0})
+
+    def test_favorites(self):
+        Favorite.objects.create(user=self.user, recipe=self.recipes[0])
+        self.assertEqual(
+            self.statuses('post', self.ids + self.ids[:1] + [10 ** 6]),
+            ['already_added', 'added', 'added', 'not_found'])
+        self.assertEqual(self.counts('favorites_count'), [1, 1, 1])
+        self.assertEqual(
+            self.statuses('delete', self.ids[:2]), ['removed', 'removed'])
+        self.assertEqual(
+            self.statuses('delete', self.ids[:2]), ['not_added', 'not_added'])
+        self.assertEqual(self.counts('favorites_count'), [0, 0, 1])
+        self.assert_no_drift()
+
+    def test_shopping_cart(self):
+        url = '/api/recipes/shopping_cart/'
+        self.assertEqual(
+            self.statuses('post', self.ids[:2], url), ['added', 'added'])
+        self.assertEqual(self.counts('shopping_cart_count'), [1, 1, 0])
+        self.assert_matches_carts()
+        self.assertEqual(
+            self.statuses('delete', self.ids, url),
+            ['removed', 'removed', 'not_added'])
+        self.assertFalse(ShoppingCart.objects.exists())
+        self.assertFalse(ShoppingListItem.objects.exists())
+        self.assert_no_drift()
+
+    def assert_matches_carts(self):
+        expected = set(aggregate(
+            IngredientAmount, {'recipe__shoppingcart__isnull': False}))
+        actual = set(ShoppingListItem.objects.values_list(
+            'user_id', 'ingredient_id', 'total_amount', 'recipes_count'))
+        self.assertEqual(actual, expected)
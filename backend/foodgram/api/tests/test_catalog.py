@@ -0,0 +1,48 @@
+from api.cache import get_catalog_version
+from api.models import Tag
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .factories import LOCMEM_CACHES, make_ingredients
+
+
+@override_settings(CACHES=LOCMEM_CACHES, INGREDIENT_INDEX_ASYNC=False)
+class CatalogCacheTests(TestCase):
+    """Справочники отдаются из кеша с ETag по версии справочников,
+    ответы автодополнения помечаются ETag, но не кешируются."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        Tag.objects.create(name='Завтрак', color='#E26C2D', slug='breakfast')
+        make_ingredients('salt', 'sugar')
+
+    def test_etag_and_not_modified(self):
+        response = self.client.get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/tags/')
+        self.assertEqual(response['ETag'], etag)
+
+    def test_catalog_change_invalidates(self):
+        etag = self.client.get('/api/tags/')['ETag']
+        Tag.objects.create(name='Обед', color='#49B64E', slug='lunch')
+        response = self.client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 2)
+
+    def test_autocomplete_not_cached(self):
+        path = '/api/ingredients/?name=sa'
+        response = self.client.get(path)
+        self.assertEqual(
+            [entry['name'] for entry in response.data], ['salt'])
+        key = f'ingredients:{get_catalog_version()}:{path}'
+        self.assertIsNone(cache.get(key))
+        response = self.client.get(
+            path, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,89 @@
+from api.models import Favorite, Recipe
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .factories import LOCMEM_CACHES, make_recipe, make_user
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ConditionalResponseTests(TestCase):
+    """Список и рецепт отвечают 304 по ETag, пока не изменились
+    данные страницы; Last-Modified отдается только для рецепта."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = make_user('author')
+        self.user = make_user('user')
+        self.recipes = [
+            make_recipe(self.author, name=f'Рецепт {number}')
+            for number in range(3)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_not_modified(self):
+        path = '/api/recipes/?limit=6'
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+        etag = response['ETag']
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Favorite.objects.create(user=self.user, recipe=self.recipes[0])
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['results'][-1]['is_favorited'])
+
+    def test_deletion_changes_page(self):
+        path = '/api/recipes/?limit=1&page=2'
+        self.assertNotIn('Last-Modified', APIClient().get(path))
+        etag = self.client.get(path)['ETag']
+        self.recipes[2].delete()
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(
+            response.data['results'][0]['id'], self.recipes[0].pk)
+
+    def test_retrieve_last_modified(self):
+        path = f'/api/recipes/{self.recipes[0].pk}/'
+        response = APIClient().get(path)
+        self.assertIn('Last-Modified', response)
+        response = APIClient().get(
+            path, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(path)
+        self.assertNotIn('Last-Modified', response)
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_save_refreshes_version(self):
+        recipe = self.recipes[0]
+        version = recipe.version
+        recipe.name = 'Новое название'
+        recipe.save()
+        self.assertEqual(recipe.version, version + 1)
+        recipe.save()
+        self.assertEqual(
+            Recipe.objects.get(pk=recipe.pk).version, version + 2)
+
+    def test_count_shared_between_users(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/recipes/?limit=6')
+        counts = [
+            query['sql'] for query in queries
+            if 'COUNT(' in query['sql']
+        ]
+        self.assertEqual(len(counts), 1)
+        self.assertNotIn('EXISTS', counts[0])
+        other = APIClient()
+        other.force_authenticate(self.author)
+        with CaptureQueriesContext(connection) as queries:
+            response = other.get('/api/recipes/?limit=6')
+        self.assertEqual(response.data['count'], 3)
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries))
@@ -0,0 +1,67 @@
+from api.counters import reconcile_all
+from api.models import Follow, Recipe
+from django.apps import apps
+from django.test import TestCase
+from rest_framework.test import APIClient
+from users.models import User
+
+from .factories import make_recipe, make_user
+
+
+class CounterTests(TestCase):
+    """Денормализованные счетчики совпадают с числом связанных записей."""
+
+    def setUp(self):
+        self.user = make_user('reader')
+        self.author = make_user('author')
+        self.recipes = [
+            make_recipe(self.author, name=f'Рецепт {i}') for i in range(3)]
+        self.ids = [recipe.pk for recipe in self.recipes]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def counts(self, field):
+        return list(Recipe.objects.filter(pk__in=self.ids).order_by(
+            'pk').values_list(field, flat=True))
+
+    def assert_no_drift(self):
+        self.assertEqual(
+            set(reconcile_all(apps, dry_run=True).values()), {0})
+
+    def test_recipes_count(self):
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 3)
+        self.recipes[0].delete()
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 2)
+        self.assert_no_drift()
+
+    def test_favorite_and_cart(self):
+        pk = self.ids[0]
+        self.client.post(f'/api/recipes/{pk}/favorite/')
+        self.client.post(f'/api/recipes/{pk}/favorite/')
+        self.client.post(f'/api/recipes/{pk}/shopping_cart/')
+        self.assertEqual(self.counts('favorites_count'), [1, 0, 0])
+        self.assertEqual(self.counts('shopping_cart_count'), [1, 0, 0])
+        self.client.delete(f'/api/recipes/{pk}/favorite/')
+        self.assertEqual(self.counts('favorites_count'), [0, 0, 0])
+        self.assert_no_drift()
+
+    def test_followers_count(self):
+        response = self.client.post(
+            f'/api/users/{self.author.pk}/subscribe/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['followers_count'], 1)
+        self.client.delete(f'/api/users/{self.author.pk}/subscribe/')
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 0)
+        self.assert_no_drift()
+
+    def test_reconcile_fixes_drift(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        Recipe.objects.filter(pk=self.ids[0]).update(favorites_count=5)
+        User.objects.filter(pk=self.author.pk).update(followers_count=0)
+        drift = reconcile_all(apps)
+        self.assertEqual(drift['Recipe.favorites_count'], 1)
+        self.assertEqual(drift['User.followers_count'], 1)
+        self.assert_no_drift()
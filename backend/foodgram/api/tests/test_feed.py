@@ -0,0 +1,79 @@
+from api.feed import get_feed
+from api.models import FeedEntry, Follow
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .factories import make_recipe, make_user
+
+
+@override_settings(FEED_MAX_LENGTH=3, FEED_FANOUT_MAX_FOLLOWERS=1)
+class FeedTests(TestCase):
+    """Лента подписок: раскладка рецептов при публикации, обрезка
+    до FEED_MAX_LENGTH и подмешивание рецептов популярных авторов."""
+
+    def setUp(self):
+        self.reader = make_user('reader')
+        self.author = make_user('author')
+        self.popular = make_user('popular')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.popular)
+        Follow.objects.create(user=make_user('fan'), author=self.popular)
+        self.popular.refresh_from_db()
+        self.start = timezone.now() - timezone.timedelta(days=1)
+
+    def publish(self, author, minutes):
+        """Публикация рецепта и перенос его даты в прошлое: новый
+        рецепт при раскладке всегда новее уже опубликованных."""
+        recipe = make_recipe(author, name=f'{author} {minutes}')
+        recipe.pub_date = self.start + timezone.timedelta(minutes=minutes)
+        recipe.save()
+        FeedEntry.objects.filter(recipe=recipe).update(
+            pub_date=recipe.pub_date)
+        return recipe
+
+    def feed_ids(self, position=None, limit=10):
+        return [
+            recipe_id
+            for pub_date, recipe_id in get_feed(self.reader, position, limit)
+        ]
+
+    def test_fan_out_and_trim(self):
+        recipes = [self.publish(self.author, minutes) for minutes in range(5)]
+        entries = FeedEntry.objects.filter(user=self.reader)
+        self.assertEqual(entries.count(), 3)
+        self.assertEqual(
+            set(entries.values_list('recipe_id', flat=True)),
+            {recipe.pk for recipe in recipes[-3:]})
+
+    def test_popular_author_is_not_fanned_out(self):
+        self.publish(self.popular, 1)
+        self.assertFalse(FeedEntry.objects.filter(
+            author=self.popular).exists())
+
+    def test_merge_orders_both_sources(self):
+        first = self.publish(self.author, 1)
+        second = self.publish(self.popular, 2)
+        third = self.publish(self.author, 3)
+        fourth = self.publish(self.popular, 4)
+        self.assertEqual(
+            self.feed_ids(), [fourth.pk, third.pk, second.pk, first.pk])
+        page = get_feed(self.reader, None, 2)
+        self.assertEqual(
+            [recipe_id for pub_date, recipe_id in page],
+            [fourth.pk, third.pk])
+        self.assertEqual(
+            self.feed_ids(position=page[-1]), [second.pk, first.pk])
+
+    def test_unfollow_removes_entries(self):
+        self.publish(self.author, 1)
+        Follow.objects.get(user=self.reader, author=self.author).delete()
+        self.assertEqual(self.feed_ids(), [])
+
+    def test_follow_adds_recent_recipes(self):
+        new_author = make_user('new')
+        recipes = [self.publish(new_author, minutes) for minutes in range(4)]
+        Follow.objects.create(user=self.reader, author=new_author)
+        self.assertEqual(
+            set(FeedEntry.objects.filter(
+                user=self.reader).values_list('recipe_id', flat=True)),
+            {recipe.pk for recipe in recipes[-3:]})
@@ -0,0 +1,71 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from api.images import build_variants, has_variants
+from api.models import Recipe
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TransactionTestCase, override_settings
+from PIL import Image
+
+from .factories import LOCMEM_CACHES, make_recipe, make_user
+
+
+def save_image(name, color):
+    buffer = BytesIO()
+    Image.new('RGB', (800, 600), color).save(buffer, 'PNG')
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+class ImageVariantsTests(TransactionTestCase):
+    """Копии изображения помечаются исходным файлом, не пересоздаются
+    при переименовании хранилищем и удаляются при смене изображения."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(
+            MEDIA_ROOT=media_root,
+            RECIPE_IMAGE_ASYNC=False,
+            CACHES=LOCMEM_CACHES
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def variants(self, recipe):
+        recipe.refresh_from_db()
+        return [recipe.image_thumbnail.name, recipe.image_card.name]
+
+    def test_variants_follow_image(self):
+        save_image('recipe/thumbnail/test.webp', 'white')
+        recipe = make_recipe(
+            make_user('author'), image=save_image('recipe/test.png', 'red'))
+        first = self.variants(recipe)
+        self.assertNotIn('recipe/thumbnail/test.webp', first)
+        self.assertTrue(has_variants(recipe))
+        self.assertTrue(all(map(default_storage.exists, first)))
+
+        recipe.name = 'Новое название'
+        recipe.save()
+        self.assertEqual(self.variants(recipe), first)
+
+        recipe.image = save_image('recipe/other.png', 'blue')
+        recipe.save()
+        second = self.variants(recipe)
+        self.assertTrue(has_variants(recipe))
+        self.assertTrue(all(map(default_storage.exists, second)))
+        self.assertFalse(any(map(default_storage.exists, first)))
+
+    def test_stale_build_is_discarded(self):
+        recipe = make_recipe(
+            make_user('author'), image=save_image('recipe/test.png', 'red'))
+        current = self.variants(recipe)
+        Recipe.objects.filter(pk=recipe.pk).update(
+            image=save_image('recipe/other.png', 'blue'))
+        build_variants(recipe.pk, 'recipe/test.png')
+        self.assertEqual(self.variants(recipe), current)
+        self.assertEqual(
+            sorted(default_storage.listdir('recipe/thumbnail')[1]),
+            [current[0].split('/')[-1]]
+        )
@@ -0,0 +1,64 @@
+from api.models import Tag, TagRecipe
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from .factories import LOCMEM_CACHES, make_recipe, make_user
+
+WITH_VARIANTS = {'image_variants_source': 'recipe/test.png'}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AnonymousListCacheTests(TransactionTestCase):
+    """Страницы списка для анонимных пользователей отдаются из кеша
+    и сбрасываются при любом изменении выводимых в них счетчиков.
+    Поколения меняются после фиксации транзакции, поэтому тесты
+    выполняются без общей транзакции."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = make_user('author')
+        self.user = make_user('user')
+        self.tag = Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast')
+        self.recipe = make_recipe(self.author, **WITH_VARIANTS)
+        self.tagged = make_recipe(
+            self.author, name='С тэгом', **WITH_VARIANTS)
+        TagRecipe.objects.create(recipe=self.tagged, tag=self.tag)
+        self.anonymous = APIClient()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, path='/api/recipes/?limit=6'):
+        return {
+            recipe['id']: recipe
+            for recipe in self.anonymous.get(path).data['results']
+        }
+
+    def test_served_from_cache(self):
+        self.get()
+        with self.assertNumQueries(0):
+            self.get()
+
+    def test_favorites_count(self):
+        self.get('/api/recipes/?limit=6&tags=breakfast')
+        self.client.post(f'/api/recipes/{self.tagged.pk}/favorite/')
+        recipes = self.get('/api/recipes/?limit=6&tags=breakfast')
+        self.assertEqual(recipes[self.tagged.pk]['favorites_count'], 1)
+        self.client.delete(
+            '/api/recipes/favorite/', {'recipes': [self.tagged.pk]},
+            format='json')
+        recipes = self.get('/api/recipes/?limit=6&tags=breakfast')
+        self.assertEqual(recipes[self.tagged.pk]['favorites_count'], 0)
+
+    def test_author_counters(self):
+        self.get()
+        self.get('/api/recipes/?limit=6&tags=breakfast')
+        self.client.post(f'/api/users/{self.author.pk}/subscribe/')
+        author = self.get()[self.recipe.pk]['author']
+        self.assertEqual(author['followers_count'], 1)
+        make_recipe(self.author, name='Новый', **WITH_VARIANTS)
+        author = self.get('/api/recipes/?limit=6&tags=breakfast')[
+            self.tagged.pk]['author']
+        self.assertEqual(author['recipes_count'], 3)
+        self.assertEqual(author['followers_count'], 1)
@@ -0,0 +1,74 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from users.models import User
+
+from foodgram.metrics import Metrics, MetricsMiddleware, metrics, metrics_view
+
+from .factories import make_user
+
+
+class MetricsTests(TestCase):
+    """Метрики считают запросы, SQL и размер ответа по представлению
+    и отдаются только администратору или по токену."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def get(self, user=None, **headers):
+        request = self.factory.get('/metrics', **headers)
+        request.user = user or AnonymousUser()
+        return metrics_view(request)
+
+    def test_render(self):
+        local = Metrics((0.1, 1))
+        labels = ('RecipeViewSet', 'list', 'get')
+        local.observe(labels, 200, 0.05, 3, 0.01, 100)
+        local.observe(labels, 404, 2, 1, 0.02, 10)
+        text = local.render()
+        self.assertIn(
+            'foodgram_http_requests_total{view="RecipeViewSet",'
+            'action="list",method="get",status="404"} 1', text)
+        self.assertIn(
+            'foodgram_http_request_duration_seconds_bucket{view='
+            '"RecipeViewSet",action="list",method="get",le="1"} 1', text)
+        self.assertIn(
+            'foodgram_sql_queries_total{view="RecipeViewSet",'
+            'action="list",method="get"} 4', text)
+        self.assertIn('foodgram_http_response_bytes_total', text)
+
+    @override_settings(METRICS_ENABLED=True, SQL_QUERY_BUDGET=0)
+    def test_middleware(self):
+        def view(request):
+            User.objects.count()
+            return HttpResponse(b'12345')
+
+        request = self.factory.post('/unknown')
+        MetricsMiddleware(view)(request)
+        series = metrics.series[('unresolved', 'post', 'post')]
+        self.assertGreaterEqual(series.queries, 1)
+        self.assertGreaterEqual(series.response_bytes, 5)
+        self.assertGreaterEqual(series.statuses[200], 1)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_middleware_disabled(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            MetricsMiddleware(lambda request: HttpResponse())
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_access(self):
+        self.assertEqual(self.get().status_code, 403)
+        self.assertEqual(
+            self.get(HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(
+            self.get(HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+        self.assertEqual(self.get(make_user('user')).status_code, 403)
+        admin = make_user('admin')
+        admin.is_staff = True
+        self.assertEqual(self.get(admin).status_code, 200)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_empty_token_denied(self):
+        self.assertEqual(
+            self.get(HTTP_AUTHORIZATION='Bearer ').status_code, 403)
@@ -0,0 +1,71 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .factories import LOCMEM_CACHES, make_recipe, make_user
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CursorPaginationTests(TestCase):
+    """Курсорная пагинация отдает рецепты от новых к старым без COUNT
+    и недоступна при поиске."""
+
+    def setUp(self):
+        cache.clear()
+        author = make_user('author')
+        self.recipes = [
+            make_recipe(author, name=f'Рецепт {number}')
+            for number in range(5)
+        ]
+        self.client = APIClient()
+
+    def test_pages(self):
+        response = self.client.get('/api/recipes/?pagination=cursor&limit=2')
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+        ids = [recipe['id'] for recipe in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            ids += [recipe['id'] for recipe in response.data['results']]
+        self.assertEqual(
+            ids, [recipe.pk for recipe in reversed(self.recipes)])
+
+    def test_search_rejected(self):
+        response = self.client.get(
+            '/api/recipes/?pagination=cursor&search=рецепт')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('pagination', response.data)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CachedCountTests(TestCase):
+    """Число рецептов берется из кеша до первой записи в таблицы,
+    по которым оно посчитано."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = make_user('author')
+        make_recipe(self.author)
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def count(self, path='/api/recipes/?limit=1'):
+        with CaptureQueriesContext(connection) as queries:
+            count = self.client.get(path).data['count']
+        counted = any('COUNT(' in query['sql'] for query in queries)
+        return count, counted
+
+    def test_cached_until_write(self):
+        self.assertEqual(self.count(), (1, True))
+        self.assertEqual(self.count(), (1, False))
+        make_recipe(self.author)
+        self.assertEqual(self.count(), (2, True))
+
+    def test_key_includes_filter(self):
+        path = f'/api/recipes/?limit=1&author={self.author.pk}'
+        self.assertEqual(self.count(path), (1, True))
+        self.assertEqual(
+            self.count('/api/recipes/?limit=1&author=0'), (0, True))
+        self.assertEqual(self.count(path), (1, False))
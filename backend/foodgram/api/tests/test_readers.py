@@ -0,0 +1,82 @@
+from api.models import Favorite, Follow, ShoppingCart, Tag, TagRecipe
+from api.renderers import FastJSONRenderer
+from api.serializers import RecipeReadSerializer
+from api.views import RecipeViewSet
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from .factories import make_ingredients, make_recipe, make_user
+
+
+def render_both(user, params=''):
+    """Функция рендера одной страницы рецептов двумя путями: через
+    RecipeReader (список) и через RecipeReadSerializer."""
+    request = APIRequestFactory().get(f'/api/recipes/{params}')
+    if user is not None:
+        force_authenticate(request, user)
+    view = RecipeViewSet(
+        action_map={'get': 'list'}, kwargs={}, format_kwarg=None)
+    view.request = view.initialize_request(request)
+    queryset = view.get_queryset()
+    ids = list(queryset.values_list('pk', flat=True))
+    objects = queryset.in_bulk(ids)
+    serializer = RecipeReadSerializer(
+        [objects[pk] for pk in ids],
+        many=True,
+        context=view.get_serializer_context()
+    )
+    renderer = FastJSONRenderer()
+    return (
+        renderer.render(view.get_list_data(ids)),
+        renderer.render(serializer.data)
+    )
+
+
+class RecipeReaderTests(TestCase):
+    """Список рецептов без сериализатора совпадает побайтно с выводом
+    RecipeReadSerializer при любых полях fields и expand."""
+
+    def setUp(self):
+        self.user = make_user('reader')
+        self.author = make_user('author')
+        flour, sugar = make_ingredients('мука', 'сахар "тростниковый"')
+        breakfast = Tag.objects.create(
+            name='Завтрак', slug='breakfast', color='#E26C2D')
+        lunch = Tag.objects.create(name='Обед', slug='lunch', color='#49B64E')
+        first = make_recipe(self.author, {flour: 200, sugar: 50})
+        second = make_recipe(
+            self.user, {sugar: 10}, name='Рецепт с переводом',
+            image_thumbnail='recipe/thumbnail/test.webp')
+        make_recipe(self.author, name='Без ингредиентов')
+        TagRecipe.objects.create(recipe=first, tag=lunch)
+        TagRecipe.objects.create(recipe=first, tag=breakfast)
+        Follow.objects.create(user=self.user, author=self.author)
+        Favorite.objects.create(user=self.user, recipe=first)
+        ShoppingCart.objects.create(user=self.user, recipe=second)
+
+    def assert_same_bytes(self, user, params=''):
+        reader, serializer = render_both(user, params)
+        self.assertEqual(reader, serializer)
+        return reader
+
+    def test_all_fields(self):
+        rendered = self.assert_same_bytes(self.user)
+        for fragment in (
+            '"is_subscribed":true', '"is_favorited":true',
+            '"is_in_shopping_cart":true', '"slug":"breakfast"',
+            '"amount":200', 'thumbnail/test.webp'
+        ):
+            self.assertIn(fragment.encode(), rendered)
+
+    def test_anonymous(self):
+        self.assert_same_bytes(None)
+
+    def test_sparse_fields(self):
+        for params in (
+            '?fields=id,name,image,cooking_time',
+            '?fields=id,image_thumbnail,image_card,is_favorited',
+            '?expand=author',
+            '?fields=name&expand=tags,ingredients',
+        ):
+            with self.subTest(params=params):
+                self.assert_same_bytes(self.user, params)
@@ -0,0 +1,43 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .factories import LOCMEM_CACHES, make_recipe, make_user
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RecipeSearchTests(TestCase):
+    """Поиск находит рецепты по названию и описанию, совпадения
+    в названии выше, индекс обновляется при изменении рецепта."""
+
+    def setUp(self):
+        cache.clear()
+        author = make_user('author')
+        self.in_text = make_recipe(
+            author, name='Суп', text='Почти борщ, только без свеклы')
+        self.in_name = make_recipe(
+            author, name='Борщ украинский', text='Свекла и капуста')
+        self.other = make_recipe(author, name='Салат', text='Огурцы')
+        self.client = APIClient()
+
+    def search(self, query):
+        response = self.client.get(
+            '/api/recipes/', {'search': query, 'limit': 6})
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_ranking(self):
+        self.assertEqual(
+            self.search('борщ'), [self.in_name.pk, self.in_text.pk])
+        self.assertEqual(
+            self.search('свекл'), [self.in_name.pk, self.in_text.pk])
+        self.assertEqual(self.search('огурцы салат'), [self.other.pk])
+
+    def test_empty_query(self):
+        self.assertEqual(self.search('!!!'), [])
+
+    def test_index_follows_updates(self):
+        self.other.name = 'Борщ зеленый'
+        self.other.save()
+        self.assertIn(self.other.pk, self.search('борщ'))
+        self.in_name.delete()
+        self.assertNotIn(self.in_name.pk, self.search('борщ'))
@@ -0,0 +1,122 @@
+import json
+
+from api.models import IngredientAmount, ShoppingCart, ShoppingListItem, Tag
+from api.shopping_list import aggregate
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .factories import make_ingredients, make_recipe, make_user
+
+
+class ShoppingListTests(TestCase):
+    """Список покупок после любых изменений корзины и рецептов
+    совпадает с суммами, посчитанными заново по корзинам."""
+
+    def setUp(self):
+        self.user = make_user('buyer')
+        self.author = make_user('author')
+        self.flour, self.sugar, self.salt = make_ingredients(
+            'мука', 'сахар', 'соль')
+        self.pie = make_recipe(
+            self.author, {self.flour: 200, self.sugar: 50}, name='Пирог')
+        self.bread = make_recipe(
+            self.author, {self.flour: 500, self.salt: 10}, name='Хлеб')
+        self.tag = Tag.objects.create(name='Обед', slug='lunch', color='#000')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.author_client = APIClient()
+        self.author_client.force_authenticate(self.author)
+
+    def get_items(self, user=None):
+        return {
+            (item.ingredient_id, item.total_amount, item.recipes_count)
+            for item in ShoppingListItem.objects.filter(
+                user=user or self.user)
+        }
+
+    def assert_matches_carts(self):
+        expected = {
+            (user_id, ingredient_id, total, recipes)
+            for user_id, ingredient_id, total, recipes in aggregate(
+                IngredientAmount,
+                {'recipe__shoppingcart__isnull': False}
+            )
+        }
+        actual = set(ShoppingListItem.objects.values_list(
+            'user_id', 'ingredient_id', 'total_amount', 'recipes_count'))
+        self.assertEqual(actual, expected)
+
+    def update_recipe(self, recipe, amounts):
+        response = self.author_client.patch(
+            f'/api/recipes/{recipe.pk}/',
+            {
+                'name': recipe.name,
+                'text': recipe.text,
+                'cooking_time': recipe.cooking_time,
+                'tags': [self.tag.pk],
+                'ingredients': [
+                    {'id': ingredient.pk, 'amount': amount}
+                    for ingredient, amount in amounts.items()
+                ],
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+
+    def test_cart_sums_amounts(self):
+        self.client.post(f'/api/recipes/{self.pie.pk}/shopping_cart/')
+        self.client.post(f'/api/recipes/{self.bread.pk}/shopping_cart/')
+        self.assertEqual(self.get_items(), {
+            (self.flour.pk, 700, 2),
+            (self.sugar.pk, 50, 1),
+            (self.salt.pk, 10, 1),
+        })
+        self.assert_matches_carts()
+
+    def test_removing_from_cart(self):
+        self.client.post(f'/api/recipes/{self.pie.pk}/shopping_cart/')
+        self.client.post(f'/api/recipes/{self.bread.pk}/shopping_cart/')
+        self.client.delete(f'/api/recipes/{self.pie.pk}/shopping_cart/')
+        self.assertEqual(self.get_items(), {
+            (self.flour.pk, 500, 1),
+            (self.salt.pk, 10, 1),
+        })
+        self.assert_matches_carts()
+
+    def test_recipe_update_changes_every_cart(self):
+        other = make_user('other')
+        for user in (self.user, other):
+            ShoppingCart.objects.create(user=user, recipe=self.pie)
+        self.update_recipe(self.pie, {self.sugar: 80, self.salt: 5})
+        expected = {(self.sugar.pk, 80, 1), (self.salt.pk, 5, 1)}
+        self.assertEqual(self.get_items(), expected)
+        self.assertEqual(self.get_items(other), expected)
+        self.assert_matches_carts()
+
+    def test_recipe_delete(self):
+        ShoppingCart.objects.create(user=self.user, recipe=self.pie)
+        ShoppingCart.objects.create(user=self.user, recipe=self.bread)
+        self.author_client.delete(f'/api/recipes/{self.bread.pk}/')
+        self.assertEqual(self.get_items(), {
+            (self.flour.pk, 200, 1),
+            (self.sugar.pk, 50, 1),
+        })
+        self.assert_matches_carts()
+
+    def test_download_reads_aggregate(self):
+        self.client.post(
+            '/api/recipes/shopping_cart/',
+            {'recipes': [self.pie.pk, self.bread.pk]},
+            format='json'
+        )
+        self.user.refresh_from_db()
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                '/api/recipes/download_shopping_cart/?file_format=json')
+            content = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content['recipes_count'], 2)
+        self.assertIn(
+            {'name': 'мука', 'measurement_unit': 'г', 'amount': 700},
+            content['ingredients']
+        )
@@ -0,0 +1,81 @@
+import csv
+import datetime
+import json
+
+from django.db import connection
+
+
+def delete_rows(model, pks):
+    """Функция удаления строк модели по первичным ключам одним DELETE.
+    Сигналы и каскады не выполняются: зависимые данные (счетчики,
+    списки покупок) вызывающий код обновляет сам одним пакетом.
+    Возвращает число удаленных строк."""
+    if not pks:
+        return 0
+    quote_name = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(pks))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote_name(model._meta.db_table)} '
+            f'WHERE {quote_name(model._meta.pk.column)} '
+            f'IN ({placeholders})',
+            list(pks)
+        )
+        return cursor.rowcount
+
+
+class Echo:
+    """Псевдо-файл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def shop_list_txt(ingredients, n_rec):
+    """Генератор листа покупок в формате txt."""
+    now = datetime.datetime.now().strftime("%d-%m-%Y")
+    yield (
+        f'FoodGram\nВыбрано рецептов: {n_rec}'
+        f'\n-------------------\n{now}'
+        f'\nСписок покупок:'
+        f'\n-------------------'
+    )
+    for ing in ingredients.iterator():
+        yield (
+            f'\n{ing["ingredient__name"]} '
+            f'({ing["ingredient__measurement_unit"]}) - {ing["total"]}'
+        )
+
+
+def shop_list_csv(ingredients, n_rec):
+    """Генератор листа покупок в формате csv."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for ing in ingredients.iterator():
+        yield writer.writerow((
+            ing['ingredient__name'],
+            ing['ingredient__measurement_unit'],
+            ing['total']
+        ))
+
+
+def shop_list_json(ingredients, n_rec):
+    """Генератор листа покупок в формате json."""
+    yield f'{{"recipes_count": {n_rec}, "ingredients": ['
+    separator = ''
+    for ing in ingredients.iterator():
+        item = json.dumps({
+            'name': ing['ingredient__name'],
+            'measurement_unit': ing['ingredient__measurement_unit'],
+            'amount': ing['total'],
+        }, ensure_ascii=False)
+        yield f'{separator}{item}'
+        separator = ', '
+    yield ']}'
+
+
+SHOP_LIST_FORMATS = {
+    'txt': (shop_list_txt, 'text/plain; charset=utf-8'),
+    'csv': (shop_list_csv, 'text/csv; charset=utf-8'),
+    'json': (shop_list_json, 'application/json; charset=utf-8'),
+}
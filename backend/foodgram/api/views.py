@@ -1,22 +1,36 @@
-import datetime
-
-from django.http import HttpResponse
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import BooleanField, Exists, OuterRef, Prefetch, Value
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters import rest_framework as dfilters
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from users.models import User
 from users.serializers import RecipeLiteSerializer
 
-from .filters import IngredientFilter, RecipeFilter
-from .mixin import CustomGetRetrieveClass
+from .autocomplete import ingredient_index
+from .cache import (bump_table_version, get_catalog_version,
+                    get_recipe_generations, schedule_generations_bump)
+from .counters import change_counter, change_counters, get_counters
+from .filters import RecipeFilter
+from .mixin import (AnonymousListCacheMixin, ConditionalListRetrieveMixin,
+                    CustomGetRetrieveClass, SparseFieldsMixin)
 from .models import (Favorite, Ingredient, IngredientAmount, Recipe,
-                     ShoppingCart, Tag)
-from .pagination import CustomPagination
+                     ShoppingCart, Tag, TagRecipe)
+from .pagination import FeedPagination, RecipePagination
+from .parsers import LimitedJSONParser
 from .permissions import OwnerOrReadOnly
-from .serializers import (IngredientSerializer, RecipeReadSerializer,
-                          RecipeSerializer, TagSerializer)
+from .readers import NESTED_FIELDS, RecipeReader, get_columns
+from .serializers import (IngredientSerializer, RecipeIdsSerializer,
+                          RecipeReadSerializer, RecipeSerializer,
+                          TagSerializer)
+from .shopping_list import cart_changed, get_shopping_list
+from .utils import SHOP_LIST_FORMATS, delete_rows
 
 
 class TagViewSet(CustomGetRetrieveClass):
@@ -26,41 +40,213 @@ class TagViewSet(CustomGetRetrieveClass):
 
 
 class IngredientViewSet(CustomGetRetrieveClass):
-    """Класс представления ингридиентов."""
+    """Класс представления ингридиентов. Поиск по параметру name
+    выполняется индексом автодополнения и в кеш не сохраняется:
+    индекс отвечает быстрее, чем кеш с ответами на каждый запрос."""
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = (dfilters.DjangoFilterBackend,)
-    filterset_class = IngredientFilter
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if not name:
+            return super().list(request, *args, **kwargs)
+        return self.cached_response(
+            request,
+            lambda: Response(ingredient_index.search(name)),
+            store=False
+        )
+
+
+def lock_user(user):
+    """Функция блокировки строки пользователя до конца транзакции:
+    изменения его избранного и корзины выполняются по очереди, поэтому
+    добавленные и удаленные записи определяются без гонок."""
+    list(User.objects.select_for_update().filter(
+        pk=user.pk).values_list('pk', flat=True))
 
 
 def add_del_metod(request, pk, instmodel):
-    user = get_object_or_404(User, username=request.user)
+    user = request.user
     recipe = get_object_or_404(Recipe, pk=pk)
-    if str(request.method) == 'POST':
-        instmodel.objects.get_or_create(user=user, recipe=recipe)
-        recipe_serializer = RecipeLiteSerializer(recipe)
-        return Response(recipe_serializer.data, status=status.HTTP_201_CREATED)
-    instance = get_object_or_404(instmodel, user=user, recipe=recipe)
-    instance.delete()
+    with transaction.atomic():
+        lock_user(user)
+        if str(request.method) == 'POST':
+            instmodel.objects.get_or_create(user=user, recipe=recipe)
+            recipe_serializer = RecipeLiteSerializer(recipe)
+            return Response(
+                recipe_serializer.data, status=status.HTTP_201_CREATED)
+        instance = get_object_or_404(instmodel, user=user, recipe=recipe)
+        instance.delete()
     return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+BATCH_OUTCOMES = {
+    'POST': ('already_added', 'added'),
+    'DELETE': ('not_added', 'removed'),
+}
+
+
+def add_del_batch(request, instmodel):
+    """Функция пакетного добавления рецептов в избранное или корзину
+    покупок и удаления из них. Все id проверяются одним запросом под
+    блокировкой пользователя, записи добавляются одним INSERT, а
+    удаляются одним DELETE без сигналов. Счетчики и список покупок
+    пересчитываются один раз для всего пакета. INSERT пропускает
+    уже существующие пары, поэтому параллельная запись той же пары
+    не приводит к ошибке, а добавленные записи определяются повторным
+    чтением под той же блокировкой. В ответе - итог по каждому id:
+    added, already_added, removed, not_added или not_found."""
+    serializer = RecipeIdsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    ids = list(dict.fromkeys(serializer.validated_data['recipes']))
+    with transaction.atomic():
+        lock_user(request.user)
+        found = dict(Recipe.objects.filter(pk__in=ids).annotate(
+            is_related=Exists(instmodel.objects.filter(
+                user=request.user, recipe=OuterRef('pk')))
+        ).values_list('pk', 'is_related'))
+        related = instmodel.objects.filter(
+            user=request.user, recipe_id__in=list(found))
+        if request.method == 'POST':
+            missing = [pk for pk in ids if found.get(pk) is False]
+            instmodel.objects.bulk_create(
+                [instmodel(user=request.user, recipe_id=pk)
+                 for pk in missing],
+                ignore_conflicts=True
+            )
+            present = set(related.values_list('recipe_id', flat=True))
+            changed = [pk for pk in missing if pk in present]
+            delta = 1
+        else:
+            rows = dict(related.select_for_update().values_list(
+                'pk', 'recipe_id'))
+            delete_rows(instmodel, list(rows))
+            changed = list(rows.values())
+            delta = -1
+        if changed:
+            for model, counter, field in get_counters(instmodel):
+                if field == 'user':
+                    change_counter(
+                        model, request.user.pk, counter, delta * len(changed))
+                else:
+                    change_counters(model, changed, counter, delta)
+            bump_table_version(instmodel._meta.db_table)
+            if instmodel is ShoppingCart:
+                cart_changed(request.user.pk, changed)
+            if instmodel is Favorite:
+                schedule_generations_bump(
+                    TagRecipe.objects.filter(recipe_id__in=changed))
+    outcomes = BATCH_OUTCOMES[request.method]
+    changed = set(changed)
+    return Response([
+        {
+            'id': pk,
+            'status': outcomes[pk in changed] if pk in found else 'not_found'
+        }
+        for pk in ids
+    ])
+
+
+class RecipeViewSet(AnonymousListCacheMixin,
+                    ConditionalListRetrieveMixin,
+                    SparseFieldsMixin,
+                    viewsets.ModelViewSet):
     """Класс представления рецептов."""
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
-    pagination_class = CustomPagination
+    pagination_class = RecipePagination
     permission_classes = (OwnerOrReadOnly,)
+    parser_classes = (LimitedJSONParser, FormParser, MultiPartParser)
     filter_backends = (dfilters.DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    fingerprint_fields = (
+        'id', 'pub_date', 'version', 'updated_at', 'favorites_count',
+        'is_favorited', 'is_in_shopping_cart', 'author_id',
+        'author__username', 'author__email', 'author__first_name',
+        'author__last_name', 'author__recipes_count',
+        'author__followers_count'
+    )
+    page_fields = ('id', 'pub_date')
+    list_cache_params = (
+        'page', 'limit', 'tags', 'author', 'search', 'pagination',
+        'is_favorited', 'is_in_shopping_cart', 'fields', 'expand'
+    )
+    sparse_fields = RecipeReadSerializer.Meta.fields
+    expandable_fields = NESTED_FIELDS
+
+    def get_queryset(self):
+        """Функция добавления к рецептам флагов избранного и корзины
+        покупок текущего пользователя подзапросами Exists.
+        Для чтения загружаются только колонки и связанные объекты
+        полей, запрошенных параметрами fields и expand."""
+        queryset = Recipe.objects.all()
+        if self.action in ('list', 'retrieve', 'feed'):
+            queryset = self.get_read_queryset(queryset)
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField())
+            )
+        return queryset.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')))
+        )
+
+    def get_read_queryset(self, queryset):
+        fields = self.requested_fields or self.sparse_fields
+        if 'author' in fields:
+            queryset = queryset.select_related('author')
+        if 'ingredients' in fields:
+            queryset = queryset.prefetch_related(Prefetch(
+                'ingredientamount_set',
+                queryset=IngredientAmount.objects.select_related(
+                    'ingredient').order_by('pk')
+            ))
+        if 'tags' in fields:
+            queryset = queryset.prefetch_related(
+                Prefetch('tags', queryset=Tag.objects.order_by('pk')))
+        if self.requested_fields is None:
+            return queryset
+        return queryset.only(*(
+            'author' if column == 'author_id' else column
+            for column in get_columns(fields)
+            if not column.startswith(('author__', 'is_'))
+        ))
+
+    def get_list_cache_generations(self, request):
+        """Функция получения версии справочников и поколений рецептов
+        тэгов из фильтра, от которых зависит страница списка."""
+        catalog_version = get_catalog_version()
+        tag_ids = cache.get_or_set(
+            f'tag_ids:{catalog_version}',
+            lambda: dict(Tag.objects.values_list('slug', 'id')),
+            settings.CATALOG_CACHE_TIMEOUT
+        )
+        slugs = request.query_params.getlist('tags')
+        if not set(slugs) <= tag_ids.keys():
+            return None
+        return (
+            catalog_version,
+            *get_recipe_generations(tag_ids[slug] for slug in slugs)
+        )
+
+    def get_list_data(self, ids):
+        """Функция сборки списка и ленты рецептов из строк .values()
+        в обход RecipeReadSerializer."""
+        return RecipeReader(self.request, self.requested_fields).read(
+            self.get_queryset(), ids)
 
     def get_serializer_class(self):
-        if self.action == 'list' or self.action == 'retrieve':
+        if self.action in ('list', 'retrieve', 'feed'):
             return RecipeReadSerializer
         return RecipeSerializer
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
+        self.request.user.refresh_from_db(fields=('recipes_count',))
 
     @action(
         methods=['post', 'delete'],
@@ -78,33 +264,59 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def to_shopping_cart_add_del(self, request, pk=None):
         return add_del_metod(request, pk, ShoppingCart)
 
-    @action(methods=['get'], detail=False, url_path='download_shopping_cart')
+    @action(
+        methods=['post', 'delete'],
+        detail=False,
+        url_path='favorite',
+        permission_classes=(IsAuthenticated,)
+    )
+    def to_favorite_batch(self, request):
+        return add_del_batch(request, Favorite)
+
+    @action(
+        methods=['post', 'delete'],
+        detail=False,
+        url_path='shopping_cart',
+        permission_classes=(IsAuthenticated,)
+    )
+    def to_shopping_cart_batch(self, request):
+        return add_del_batch(request, ShoppingCart)
+
+    @action(
+        methods=['get'],
+        detail=False,
+        permission_classes=(IsAuthenticated,)
+    )
+    def feed(self, request):
+        """Функция ленты рецептов авторов, на которых подписан
+        пользователь, от новых к старым."""
+        paginator = FeedPagination()
+        page = paginator.paginate_feed(request)
+        return paginator.get_paginated_response(self.get_list_data(page))
+
+    @action(
+        methods=['get'],
+        detail=False,
+        url_path='download_shopping_cart',
+        permission_classes=(IsAuthenticated,)
+    )
     def load_shop_list(self, request):
-        """Функция скачивания листа покупок в файле txt."""
-        user = get_object_or_404(User, username=request.user)
-        recipes_id = ShoppingCart.objects.filter(user=user).values('recipe')
-        recipes = Recipe.objects.filter(pk__in=recipes_id)
-        shop_dict = {}
-        n_rec = 0
-        for recipe in recipes:
-            n_rec += 1
-            ing_amounts = IngredientAmount.objects.filter(recipe=recipe)
-            for ing in ing_amounts:
-                if ing.ingredient.name in shop_dict:
-                    shop_dict[ing.ingredient.name][0] += ing.amount
-                else:
-                    shop_dict[ing.ingredient.name] = [
-                        ing.amount,
-                        ing.ingredient.measurement_unit
-                    ]
-        now = datetime.datetime.now()
-        now = now.strftime("%d-%m-%Y")
-        shop_string = (
-            f'FoodGram\nВыбрано рецептов: {n_rec}\
-            \n-------------------\n{now}\
-            \nСписок покупок:\
-            \n-------------------'
+        """Функция скачивания листа покупок в формате txt, csv или json.
+        Число рецептов берется из счетчика корзины пользователя,
+        поэтому весь ответ читается одним запросом к списку покупок."""
+        file_format = request.query_params.get('file_format', 'txt')
+        if file_format not in SHOP_LIST_FORMATS:
+            return Response(
+                {'errors': f'Неизвестный формат файла: {file_format}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        generator, content_type = SHOP_LIST_FORMATS[file_format]
+        ingredients = get_shopping_list(request.user)
+        response = StreamingHttpResponse(
+            generator(ingredients, request.user.shopping_cart_count),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_list.{file_format}"'
         )
-        for key, value in shop_dict.items():
-            shop_string += f'\n{key} ({value[1]}) - {str(value[0])}'
-        return HttpResponse(shop_string, content_type='text/plain')
+        return response
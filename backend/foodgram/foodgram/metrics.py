@@ -0,0 +1,225 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LABELS = ('view', 'action', 'method')
+
+
+class Series:
+    """Накопленные показатели запросов к одному представлению."""
+
+    def __init__(self, buckets):
+        self.requests = 0
+        self.statuses = {}
+        self.buckets = [0] * len(buckets)
+        self.duration = 0.0
+        self.queries = 0
+        self.sql_duration = 0.0
+        self.response_bytes = 0
+
+
+class Metrics:
+    """Метрики запросов, собираемые в памяти процесса: у каждого
+    воркера свои, счетчики растут с его запуска."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, labels, status, duration, queries, sql_duration,
+                size):
+        bucket = bisect_left(self.buckets, duration)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = Series(self.buckets)
+            series.requests += 1
+            series.statuses[status] = series.statuses.get(status, 0) + 1
+            if bucket < len(self.buckets):
+                series.buckets[bucket] += 1
+            series.duration += duration
+            series.queries += queries
+            series.sql_duration += sql_duration
+            series.response_bytes += size
+
+    @staticmethod
+    def format_labels(labels, **extra):
+        pairs = [*zip(LABELS, labels), *extra.items()]
+        return ','.join(
+            '{}="{}"'.format(name, str(value).replace('\\', '\\\\')
+                             .replace('"', '\\"').replace('\n', '\\n'))
+            for name, value in pairs
+        )
+
+    def render(self):
+        """Функция вывода метрик в текстовом формате Prometheus."""
+        with self.lock:
+            series = sorted(
+                (
+                    labels,
+                    dict(vars(item), buckets=list(item.buckets)),
+                    dict(item.statuses)
+                )
+                for labels, item in self.series.items()
+            )
+        lines = []
+
+        def family(name, kind, description, samples):
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(samples)
+
+        family(
+            'foodgram_http_requests_total', 'counter',
+            'Число запросов по представлению и коду ответа.',
+            [
+                f'foodgram_http_requests_total'
+                f'{{{self.format_labels(labels, status=status)}}} {count}'
+                for labels, values, statuses in series
+                for status, count in sorted(statuses.items())
+            ]
+        )
+        samples = []
+        for labels, values, statuses in series:
+            total = 0
+            for bound, count in zip(self.buckets, values['buckets']):
+                total += count
+                samples.append(
+                    f'foodgram_http_request_duration_seconds_bucket'
+                    f'{{{self.format_labels(labels, le=bound)}}} {total}')
+            samples.append(
+                f'foodgram_http_request_duration_seconds_bucket'
+                f'{{{self.format_labels(labels, le="+Inf")}}} '
+                f'{values["requests"]}')
+            samples.append(
+                f'foodgram_http_request_duration_seconds_sum'
+                f'{{{self.format_labels(labels)}}} {values["duration"]}')
+            samples.append(
+                f'foodgram_http_request_duration_seconds_count'
+                f'{{{self.format_labels(labels)}}} {values["requests"]}')
+        family(
+            'foodgram_http_request_duration_seconds', 'histogram',
+            'Время обработки запроса.', samples
+        )
+        for name, key, description in (
+            ('foodgram_sql_queries_total', 'queries',
+             'Число SQL-запросов.'),
+            ('foodgram_sql_duration_seconds_total', 'sql_duration',
+             'Время выполнения SQL-запросов.'),
+            ('foodgram_http_response_bytes_total', 'response_bytes',
+             'Размер тел ответов.'),
+        ):
+            family(name, 'counter', description, [
+                f'{name}{{{self.format_labels(labels)}}} {values[key]}'
+                for labels, values, statuses in series
+            ])
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics(settings.METRICS_LATENCY_BUCKETS)
+
+
+class QueryCounter:
+    """Обертка выполнения SQL, считающая запросы и их время."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+def get_labels(request):
+    """Функция получения представления и действия запроса. Для наборов
+    представлений DRF действие - имя метода (list, retrieve, feed),
+    для остальных - HTTP-метод."""
+    method = request.method.lower()
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved', method, method
+    view = getattr(match.func, 'cls', match.func)
+    actions = getattr(match.func, 'actions', None) or {}
+    return view.__name__, actions.get(method, method), method
+
+
+def get_response_size(response):
+    if response.streaming:
+        return int(response.get('Content-Length', 0))
+    return len(response.content)
+
+
+class MetricsMiddleware:
+    """Middleware учета запросов: число, время, SQL-запросы и их время,
+    размер ответа по представлению и действию. Запросы, выполнившие
+    больше SQL_QUERY_BUDGET SQL-запросов, записываются в лог. SQL,
+    выполняемый при отдаче потокового ответа, не учитывается."""
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+        labels = get_labels(request)
+        metrics.observe(
+            labels,
+            response.status_code,
+            duration,
+            counter.count,
+            counter.duration,
+            get_response_size(response)
+        )
+        budget = settings.SQL_QUERY_BUDGET
+        if budget and counter.count > budget:
+            logger.warning(
+                '%s %s (%s.%s): %d SQL-запросов при бюджете %d, '
+                'SQL %.1f мс, всего %.1f мс',
+                request.method, request.get_full_path(), *labels[:2],
+                counter.count, budget, counter.duration * 1000,
+                duration * 1000
+            )
+        return response
+
+
+def has_metrics_access(request):
+    """Функция проверки доступа к метрикам: администратор или
+    заголовок Authorization: Bearer <METRICS_TOKEN>."""
+    if request.user.is_staff:
+        return True
+    token = settings.METRICS_TOKEN
+    scheme, _, credentials = request.META.get(
+        'HTTP_AUTHORIZATION', '').partition(' ')
+    return bool(token) and scheme.lower() == 'bearer' and (
+        constant_time_compare(credentials, token))
+
+
+def metrics_view(request):
+    """Метрики текущего воркера в формате Prometheus."""
+    if not has_metrics_access(request):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type=CONTENT_TYPE)
@@ -46,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -155,6 +156,10 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
 DJOSER = {
@@ -172,8 +177,95 @@ DJOSER = {
     'HIDE_USERS': False,
 }
 
+# Версии справочников, таблиц и списков рецептов хранятся в кеше
+# и должны быть общими для всех воркеров и management-команд,
+# поэтому кеш по умолчанию - memcached из infra/docker-compose.yml.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.memcached.MemcachedCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='memcached:11211'),
+    }
+}
+
+PAGINATION_COUNT_CACHE_TIMEOUT = int(
+    os.getenv('PAGINATION_COUNT_CACHE_TIMEOUT', default=60)
+)
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = int(
+    os.getenv('PAGINATION_COUNT_ESTIMATE_THRESHOLD', default=100_000)
+)
+RECIPE_LIST_CACHE_TIMEOUT = int(
+    os.getenv('RECIPE_LIST_CACHE_TIMEOUT', default=60)
+)
+RECIPE_LIST_CACHE_PAGES = int(os.getenv('RECIPE_LIST_CACHE_PAGES', default=5))
+
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', default=3600))
+
+INGREDIENT_SEARCH_LIMIT = int(os.getenv('INGREDIENT_SEARCH_LIMIT', default=50))
+INGREDIENT_INDEX_MAX_SIZE = int(
+    os.getenv('INGREDIENT_INDEX_MAX_SIZE', default=50_000)
+)
+INGREDIENT_INDEX_ASYNC = (
+    os.getenv('INGREDIENT_INDEX_ASYNC', default='True') == 'True'
+)
+
+RECIPE_IMAGE_MAX_SIZE = int(
+    os.getenv('RECIPE_IMAGE_MAX_SIZE', default=10 * 1024 ** 2)
+)
+RECIPE_IMAGE_MAX_PIXELS = int(
+    os.getenv('RECIPE_IMAGE_MAX_PIXELS', default=40_000_000)
+)
+RECIPE_REQUEST_MAX_SIZE = RECIPE_IMAGE_MAX_SIZE * 4 // 3 + 1024 ** 2
+
+RECIPE_IMAGE_VARIANTS = {
+    'thumbnail': (240, 160),
+    'card': (720, 480),
+}
+RECIPE_IMAGE_FORMAT = os.getenv('RECIPE_IMAGE_FORMAT', default='WEBP')
+RECIPE_IMAGE_QUALITY = int(os.getenv('RECIPE_IMAGE_QUALITY', default=80))
+RECIPE_IMAGE_WORKERS = int(os.getenv('RECIPE_IMAGE_WORKERS', default=2))
+RECIPE_IMAGE_ASYNC = os.getenv('RECIPE_IMAGE_ASYNC', default='True') == 'True'
+
+RECIPE_BATCH_MAX_SIZE = int(os.getenv('RECIPE_BATCH_MAX_SIZE', default=100))
+
+FEED_MAX_LENGTH = int(os.getenv('FEED_MAX_LENGTH', default=500))
+FEED_FANOUT_MAX_FOLLOWERS = int(
+    os.getenv('FEED_FANOUT_MAX_FOLLOWERS', default=1000)
+)
+
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 
 # ACCOUNT_AUTHENTICATION_METHOD = 'email'#
 # ACCOUNT_EMAIL_REQUIRED = True
 # ACCOUNT_USERNAME_REQUIRED = False
+
+# Метрики отдаются по /metrics только при METRICS_ENABLED=True
+# администратору или по заголовку Authorization: Bearer <METRICS_TOKEN>.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', default='False') == 'True'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', default='')
+METRICS_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+SQL_QUERY_BUDGET = int(os.getenv('SQL_QUERY_BUDGET', default=0))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+        'foodgram': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
@@ -8,8 +8,12 @@ from .models import User
 class UserAdmin(UserAdmin):
     list_display = (
         'id', 'username', 'email', 'first_name',
-        'last_name', 'password'
+        'last_name', 'password', 'recipes_count', 'followers_count'
     )
     list_display_links = ('id', 'username')
     search_fields = ('username', 'email',)
+    readonly_fields = ('recipes_count', 'followers_count')
+    fieldsets = UserAdmin.fieldsets + (
+        ('Счетчики', {'fields': ('recipes_count', 'followers_count')}),
+    )
     empty_value_display = '-пусто-'
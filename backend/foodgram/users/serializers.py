@@ -1,5 +1,6 @@
+from api.context import get_user_context
+from api.fields import ImageVariantField
 from api.models import Follow, Recipe
-from django.shortcuts import get_object_or_404
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
@@ -27,27 +28,29 @@ class MyUserSerializer(UserSerializer):
         model = User
         fields = (
             'email', 'id', 'username', 'first_name',
-            'last_name', 'is_subscribed'
+            'last_name', 'is_subscribed', 'recipes_count', 'followers_count'
         )
+        read_only_fields = ('recipes_count', 'followers_count')
 
     def get_is_subscribed(self, obj):
         """Функция определения подписан ли текущий пользователь на автора."""
         if self.context:
-            username = self.context['request'].user
-            if not username.is_authenticated or obj.username == username:
-                return False
-            user = get_object_or_404(User, username=username)
-            author = get_object_or_404(User, username=obj.username)
-            return Follow.objects.filter(user=user, author=author).exists()
+            context = get_user_context(self.context['request'])
+            return obj.pk in context.following_ids
         return False
 
 
 class RecipeLiteSerializer(serializers.ModelSerializer):
     image = Base64ImageField(read_only=True)
+    image_thumbnail = ImageVariantField()
+    image_card = ImageVariantField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = (
+            'id', 'name', 'image', 'image_thumbnail', 'image_card',
+            'cooking_time'
+        )
         read_only_fields = ('id', 'name', 'cooking_time')
 
 
@@ -57,43 +60,39 @@ class MyUserSubsSerializer(UserSerializer):
     числом рецептов."""
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
         fields = (
             'email', 'id', 'username', 'first_name',
-            'last_name', 'is_subscribed', 'recipes', 'recipes_count'
+            'last_name', 'is_subscribed', 'recipes', 'recipes_count',
+            'followers_count'
+        )
+        read_only_fields = (
+            'email', 'username', 'first_name', 'last_name',
+            'recipes_count', 'followers_count'
         )
-        read_only_fields = ('email', 'username', 'first_name', 'last_name')
 
     def get_is_subscribed(self, obj):
         if self.context:
-            username = self.context['request'].user
-            if not username.is_authenticated or obj.username == username:
-                return False
-            user = get_object_or_404(User, username=username)
-            author = get_object_or_404(User, username=obj.username)
-            return Follow.objects.filter(user=user, author=author).exists()
+            context = get_user_context(self.context['request'])
+            return obj.pk in context.following_ids
         return True
 
     def get_recipes(self, obj):
+        if 'recipes' in self.context:
+            return RecipeLiteSerializer(
+                self.context['recipes'][obj.pk], many=True).data
         request = self.context.get('request')
         try:
             limit = request.GET.get('recipes_limit')
         except AttributeError:
             limit = False
-        author = get_object_or_404(User, username=obj.username)
-        recipes = Recipe.objects.filter(author=author)
+        recipes = Recipe.objects.filter(author=obj)
         if limit:
             recipes = recipes.all()[:int(limit)]
         return RecipeLiteSerializer(recipes, many=True).data
 
-    def get_recipes_count(self, obj):
-        """Функция подсчета числа рецептов автора"""
-        author = get_object_or_404(User, username=obj.username)
-        return Recipe.objects.filter(author=author).count()
-
 
 class FollowSerializer(serializers.ModelSerializer):
     """Класс сериализатора для управления подписками."""
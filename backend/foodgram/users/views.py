@@ -1,8 +1,12 @@
+from collections import defaultdict
 
-from api.models import Follow
+from api.models import Follow, Recipe
 from api.pagination import CustomPagination
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 from django.shortcuts import get_object_or_404
-from rest_framework import mixins, status, viewsets
+from rest_framework import mixins, serializers, status, viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -13,12 +17,14 @@ from .serializers import FollowSerializer, MyUserSubsSerializer
 
 class APIFollow(APIView):
     """Класс управления подписками."""
+    @transaction.atomic
     def post(self, request, pk=None):
-        user = get_object_or_404(User, username=request.user)
         author = get_object_or_404(User, pk=pk)
-        serializer = FollowSerializer(data={"user": user.pk, "author": pk})
+        serializer = FollowSerializer(
+            data={"user": request.user.pk, "author": pk})
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        author.refresh_from_db(fields=('followers_count',))
         author_serializer = MyUserSubsSerializer(author)
         return Response(
             author_serializer.data,
@@ -26,8 +32,7 @@ class APIFollow(APIView):
         )
 
     def delete(self, request, pk=None):
-        user = get_object_or_404(User, username=request.user)
-        follow = get_object_or_404(Follow, user=user, author=pk)
+        follow = get_object_or_404(Follow, user=request.user, author=pk)
         follow.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -40,6 +45,55 @@ class SubscriptionViewSet(mixins.ListModelMixin,
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
-        user = get_object_or_404(User, username=self.request.user)
-        subscribes = Follow.objects.filter(user=user).values('author')
-        return User.objects.filter(pk__in=subscribes)
+        return User.objects.filter(
+            pk__in=Follow.objects.filter(
+                user=self.request.user).values('author')
+        ).order_by('id')
+
+    def get_recipes_limit(self):
+        """Функция проверки параметра recipes_limit: целое число
+        больше нуля или None, если параметр не передан."""
+        limit = self.request.query_params.get('recipes_limit')
+        if not limit:
+            return None
+        if not limit.isdigit() or int(limit) == 0:
+            raise serializers.ValidationError({
+                'recipes_limit': ['Ожидается целое число больше нуля.']})
+        return int(limit)
+
+    def get_recipes_preview(self, authors):
+        """Функция получения рецептов всех авторов страницы одним запросом:
+        рецепты нумеруются оконной функцией ROW_NUMBER в разрезе автора
+        и обрезаются по параметру recipes_limit."""
+        recipes = Recipe.objects.filter(
+            author__in=[author.pk for author in authors]
+        )
+        limit = self.get_recipes_limit()
+        if limit is not None:
+            windowed = recipes.order_by().annotate(row_number=Window(
+                expression=RowNumber(),
+                partition_by=[F('author')],
+                order_by=[F('pub_date').desc(), F('id').desc()]
+            ))
+            sql, params = windowed.query.sql_with_params()
+            recipes = Recipe.objects.raw(
+                f'SELECT * FROM ({sql}) windowed '
+                f'WHERE windowed.row_number <= %s '
+                f'ORDER BY windowed.pub_date DESC, windowed.id DESC',
+                (*params, limit)
+            )
+        preview = defaultdict(list)
+        for recipe in recipes:
+            preview[recipe.author_id].append(recipe)
+        return preview
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        authors = queryset if page is None else page
+        context = self.get_serializer_context()
+        context['recipes'] = self.get_recipes_preview(authors)
+        serializer = self.get_serializer(authors, many=True, context=context)
+        if page is None:
+            return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)